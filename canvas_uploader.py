@@ -7,14 +7,20 @@
 """
 
 # External imports
+import argparse
+import csv
+import heapq
 import os
+import signal
 import sys
-from concurrent.futures import ThreadPoolExecutor
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
 
 # Internal imports
-from src import CSV, Canvas, Clients, Config
+from src import CSV, Bundle, Canvas, Clients, Config
 from src import File as SourceFile
-from src import Image, Logger, Settings, custom_errors
+from src import Image, Journal, Logger, Planner, Settings, Tracing, custom_errors
 
 
 def check_python_version() -> None:
@@ -44,6 +50,59 @@ def check_python_version() -> None:
         exit()
 
 
+def parse_arguments(arguments: list[str] = None) -> argparse.Namespace:
+    """Parses the command line options for the program"""
+    parser = argparse.ArgumentParser(
+        description="Mass upload and apply user avatars in canvas"
+    )
+    parser.add_argument(
+        "--csv",
+        help="CSV file to read users from, overrides the settings file. "
+        "A verification report can be passed here to retry failed users",
+    )
+    parser.add_argument(
+        "--prepare",
+        metavar="BUNDLE",
+        help="Validate the CSV and images and pack them into a bundle file, nothing is uploaded",
+    )
+    parser.add_argument(
+        "--push",
+        metavar="BUNDLE",
+        help="Upload the users in a bundle made by --prepare instead of the CSV and images",
+    )
+    parser.add_argument(
+        "--benchmark",
+        action="store_true",
+        help="Compare API throughput over the HTTP/1.1 pool and HTTP/2, nothing is uploaded",
+    )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Estimate the requests, bytes and duration of the run, nothing is uploaded",
+    )
+    parser.add_argument(
+        "--reset",
+        action="store_true",
+        help="Reset each user's avatar to the default and delete their uploaded pictures",
+    )
+    parser.add_argument(
+        "--ids",
+        help="File of client ids, one per line, to reset instead of the users in the CSV",
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="Verify each user's avatar after the upload has finished",
+    )
+    parser.add_argument(
+        "--verify-only",
+        action="store_true",
+        help="Verify each user's avatar without uploading",
+    )
+
+    return parser.parse_args(arguments)
+
+
 ##############################
 # FUNCTIONS
 ##############################
@@ -54,6 +113,12 @@ class Main:
 
     # Constants
     SETTINGS_DIRECTORY = "./Settings/"
+    MAX_WORKERS = 10
+    VERIFY_BATCH_SIZE = 100
+    VERIFY_REPORT_FILENAME = "verify_mismatches.csv"
+    PROGRESS_INTERVAL = 0.5
+    BENCHMARK_REQUESTS = 200
+    DEFAULT_PRIORITY = 100
 
     # Class variables
     settings: Config.Config
@@ -62,6 +127,11 @@ class Main:
         self.settings_loader = Settings.SettingsLoader()
         self.settings_parser = Config.YAML_Parser()
         self.skipped_users: list[Clients.client] = []
+        self.journal: Journal.OutcomeJournal = None
+        self.workers: int = self.MAX_WORKERS
+        # SIS id to the image names and file ids to delete when resetting
+        self.reset_targets: dict[str, tuple[set, set]] = {}
+        self.stop_requested = threading.Event()
 
     def check_directories(self, *directory_list) -> None:
         """
@@ -88,6 +158,15 @@ class Main:
             else:
                 self.log.info('File: "%s" found.', directory)
 
+            # Image archives are files rather than folders
+            if os.path.isfile(directory):
+                if os.path.getsize(directory) == 0:
+                    self.log.exception(ValueError(f"FILE: File EMPTY: {directory}"))
+                    raise custom_errors.DirectoriesCheckError(
+                        f"File is empty: {directory}"
+                    )
+                continue
+
             # If folder empty, then raise value error
             if not os.listdir(directory):
                 self.log.exception(ValueError(f"FILE: Directory EMPTY: {directory}"))
@@ -96,7 +175,7 @@ class Main:
                 )
 
     def create_student_list(
-        self, client_list: list[dict[str, str]], img_location: str
+        self, client_list: list[dict[str, str]], img_source: Image.imageSource
     ) -> list[Clients.client]:
         """Returns a list of user objects"""
         # Variables
@@ -112,7 +191,7 @@ class Main:
             try:
                 # Create an image factory object and validate image creation.
                 image_factory: Image.imageFactory = Image.imageFactory(
-                    img_location, student["image_filename"]
+                    img_source, student["image_filename"]
                 )
             except OSError as e:
                 # if error raised by factory, image does not exits.
@@ -130,6 +209,7 @@ class Main:
                 user: Clients.client = Clients.client(
                     student["client_id"], image_factory.open_image()
                 )
+                user.priority = self.get_priority(student)
             except Exception as user_error:
                 # Catch error creating user
                 # Write this to log
@@ -156,32 +236,158 @@ class Main:
         # Return list of user objects
         return user_list
 
-    def process_user(self, user: Clients.client, connector: Canvas.POST_data_canvas):
-        """upload a user to canvas"""
-        try:
-            # Step 0: Get canvas user ID via SIS ID
-            connector.get_canvas_id(user)
+    def get_priority(self, student: dict[str, str]) -> int:
+        """
+        Returns the priority of a CSV row, lower values are processed first.
+        A priority column is used when present, otherwise the first
+        matching rule from the settings, otherwise the default.
+        """
+        priority: str = (student.get("priority") or "").strip()
+        if priority:
+            try:
+                return int(priority)
+            except ValueError:
+                self.log.warning(
+                    "USER: Invalid priority %s for user %s", priority, student["client_id"]
+                )
 
-            # Step 1: Start upload file to user's file storage
-            connector.upload_user_data(user)
-            # if no upload happened log and next student
+        # Rules map a column value to a priority, EG: cohort: {staff: 0}
+        for column, values in self.settings.priority_rules.items():
+            value: str = (student.get(column) or "").strip()
+            if value in values:
+                return int(values[value])
 
-            # Step 2: Make API call to set avatar image
-            connector.set_image_as_avatar(user)
+        return self.DEFAULT_PRIORITY
+
+    def process_user(self, user: Clients.client, connector: Canvas.POST_data_canvas) -> bool:
+        """upload a user to canvas, returns True if the avatar was set"""
+        # Each user is a trace, the requests made for them are its spans
+        with connector.tracer.trace("user", sis_id=user.sis_id) as trace_span:
+            try:
+                # Step 0: Get canvas user ID via SIS ID, unless already known
+                if user.canvas_id is None:
+                    connector.get_canvas_id(user)
+
+                # Step 1: Start upload file to user's file storage
+                # if no upload happened log and next student
+                if not connector.upload_user_data(user):
+                    raise RuntimeError("file upload failed")
+
+                # Step 2: Make API call to set avatar image
+                if not connector.set_image_as_avatar(user):
+                    raise RuntimeError("avatar could not be set")
+            except Exception as e:
+                self.log.error(
+                    "Could not process user: %s - %s",
+                    user.sis_id,
+                    e
+                )
+                self.skipped_users.append(user)
+                trace_span["outcome"] = "failed"
+                if self.journal:
+                    self.journal.record(user, "failed", error=str(e))
+                return False
+
+            trace_span["outcome"] = "done"
+            if self.journal:
+                self.journal.record(user, "done")
+            return True
+
+    def verify_user(self, user: Clients.client, connector: Canvas.POST_data_canvas) -> bool:
+        """Verify a user's avatar, treating any error as a mismatch"""
+        try:
+            return connector.verify_avatar(user)
         except Exception as e:
-            self.log.error(
-                "Could not process user: %s - %s",
-                user.client_id,
-                e
-            )
-            self.skipped_users.append(user)
+            self.log.error("Could not verify user: %s - %s", user.sis_id, e)
+            return False
+
+    def verify_users(
+        self, user_list: list[Clients.client], connector: Canvas.POST_data_canvas
+    ) -> list[Clients.client]:
+        """Verify the avatars of all users, returns the users that do not match"""
+        # Variables
+        mismatched_users: list[Clients.client] = []
+        queue = iter(user_list)
+        checked: int = 0
+        not_checked: int = 0
+
+        self.log.info("VERIFY: Verifying avatars for %i users", len(user_list))
+
+        # Interrupts stop new checks, as in the upload
+        previous_handlers = {
+            signal_number: signal.signal(signal_number, self.request_stop)
+            for signal_number in (signal.SIGINT, signal.SIGTERM)
+        }
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                future_tasks: dict = {}
+                pending: set = set()
+
+                # A rolling window, so one slow check does not hold up the others
+                while True:
+                    if self.stop_requested.is_set():
+                        for future in pending:
+                            future.cancel()
+                        not_checked += sum(1 for _ in queue)
+
+                    for user in queue:
+                        future = executor.submit(self.verify_user, user, connector)
+                        future_tasks[future] = user
+                        pending.add(future)
+                        if len(pending) >= self.workers * 2:
+                            break
+
+                    if not pending:
+                        break
+
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+                    for future in finished:
+                        if future.cancelled():
+                            not_checked += 1
+                            continue
+                        if not future.result():
+                            mismatched_users.append(future_tasks[future])
+
+                        checked += 1
+                        if checked % self.VERIFY_BATCH_SIZE == 0 or checked == len(user_list):
+                            self.log.info(
+                                "VERIFY: %i of %i users checked, %i mismatched",
+                                checked,
+                                len(user_list),
+                                len(mismatched_users),
+                            )
+        finally:
+            for signal_number, handler in previous_handlers.items():
+                signal.signal(signal_number, handler)
+
+        if not_checked:
+            self.log.warning("VERIFY: Stopped, %i users were not checked", not_checked)
+
+        return mismatched_users
+
+    def write_verify_report(self, mismatched_users: list[Clients.client]) -> str:
+        """Writes mismatched users in the CSV format so they can be retried"""
+        report_path: str = f"{self.settings.csv_directory}{self.VERIFY_REPORT_FILENAME}"
+
+        with open(report_path, "w", encoding="utf-8", newline="") as report_file:
+            writer = csv.writer(report_file)
+            writer.writerow(["client_id", "image_filename", "image_filetype"])
+            for user in mismatched_users:
+                _, extension = os.path.splitext(user.image.image_name)
+                writer.writerow(
+                    [user.sis_id, user.image.image_name, extension.lstrip(".")]
+                )
+
+        return report_path
 
     # Main function
-    def main(self):
+    def main(self, arguments: argparse.Namespace = None):
         """Main function for controlling application flow"""
         # Variables
-
-        list_of_clients: list[dict[str, str]] = []
+        if arguments is None:
+            arguments = parse_arguments([])
 
         #######################################
         # Initalise settings for the program
@@ -190,15 +396,173 @@ class Main:
         settings_file_path = self.settings_loader.find_settings_file(
             self.SETTINGS_DIRECTORY
         )
-        self.settings = self.settings_loader.load_settings(
-            settings_file_path, self.settings_parser
-        )
+        try:
+            self.settings = self.settings_loader.load_settings(
+                settings_file_path, self.settings_parser
+            )
+        except custom_errors.SettingsLoadError as e:
+            # The log is not configured until the settings are loaded
+            print(f"ERROR: Invalid settings: {e}")
+            sys.exit()
 
         #######################################
         # Initalise the log
         #######################################
         self.log = Logger.configure_logging("Settings/log_config.json", __name__)
 
+        if arguments.benchmark:
+            Canvas.benchmark_transports(
+                lambda http2: self.create_connector(http2=http2),
+                self.BENCHMARK_REQUESTS,
+                self.workers,
+            )
+            return
+
+        # Resetting avatars does not need any images
+        if arguments.reset:
+            self.reset_avatars(arguments)
+            return
+
+        ######################################
+        # Read users and their images
+        ######################################
+        if arguments.push:
+            # A prepared bundle holds both the users and the images
+            image_source = Bundle.bundle_Source(arguments.push)
+            list_of_clients = image_source.rows
+            self.log.info(
+                "BUNDLE: Loaded %i users from %s", len(list_of_clients), arguments.push
+            )
+        else:
+            list_of_clients, image_source = self.read_sources(arguments)
+
+        if arguments.prepare:
+            Bundle.bundleWriter(arguments.prepare).write(list_of_clients, image_source)
+            return
+
+        ######################################
+        # Create users
+        #####################################
+        # For each dictionary in the list
+        # log details and create a user object
+        user_list = self.create_student_list(list_of_clients, image_source)
+        self.apply_cached_canvas_ids(user_list)
+
+        if arguments.plan:
+            self.plan_run(user_list)
+            return
+
+        # Now that users have been created upload them to canvas
+        # if no users have been created. Then EXIT the program
+        if len(user_list) > 0:
+            self.log.info(
+                "All possible users have been created. A total of %i", len(user_list)
+            )
+            self.log.info("Creating canvas object...")
+        else:
+            self.log.warning("USER: no users were found. Exiting..")
+            exit()
+
+        connector: Canvas.POST_data_canvas = self.create_connector()
+        self.calibrate_workers(connector, user_list)
+
+        if not arguments.verify_only:
+            self.run_users(user_list, connector, self.process_user, "UPLOAD")
+
+        ########################################
+        # Verify the avatars that were set
+        ########################################
+        if arguments.verify or arguments.verify_only:
+            mismatched_users = self.verify_users(user_list, connector)
+
+            if mismatched_users:
+                report_path = self.write_verify_report(mismatched_users)
+                self.log.warning(
+                    "VERIFY: %i avatars do not match. Retry list written to %s",
+                    len(mismatched_users),
+                    report_path,
+                )
+            else:
+                self.log.info("VERIFY: All avatars match their uploaded image")
+
+        connector.close()
+
+    def create_connector(self, http2: bool = None) -> Canvas.POST_data_canvas:
+        """Create and initialise the canvas connector, exits if canvas cannot be reached"""
+        #########################################
+        # Create and initialise canvas connector
+        #########################################
+        # Built first so an invalid limit is not reported as a connection error
+        bandwidth = Canvas.BandwidthLimiter(
+            self.settings.bandwidth_limit, self.settings.bandwidth_schedule
+        )
+
+        try:
+            #  Attempt to connect to canvas
+            connector = Canvas.POST_data_canvas(
+                [self.settings.access_token, *self.settings.access_tokens],
+                self.settings.domain,
+                reuse_existing_files=self.settings.reuse_existing_files,
+                per_page=self.settings.per_page,
+                tracer=Tracing.Tracer(
+                    self.settings.cache_directory, self.settings.trace_sample_rate
+                ),
+                http2=self.settings.http2 if http2 is None else http2,
+                bandwidth=bandwidth,
+            )
+
+        except Exception as e:
+            # If error is reported in connecting to canvas
+            self.log.critical("CONNECTOR: Error connecting to canvas: %s", e)
+            exit()
+
+        self.log.info("Successfully created canvas connection.")
+        if connector.tracer.enabled:
+            self.log.info(
+                "TRACE: Tracing %.0f%% of users to %s",
+                self.settings.trace_sample_rate * 100,
+                connector.tracer.trace_path,
+            )
+
+        return connector
+
+    def calibrate_workers(
+        self, connector: Canvas.POST_data_canvas, user_list: list[Clients.client]
+    ) -> None:
+        """Choose the number of workers by measuring canvas, if enabled"""
+        if not self.settings.calibrate:
+            return
+
+        calibrator = Canvas.ConcurrencyCalibrator(connector, self.settings.cache_directory)
+        try:
+            self.workers = calibrator.calibrate(user_list, self.MAX_WORKERS)
+        except Exception as e:
+            # The run can continue with the default worker count
+            self.log.warning("CALIBRATE: Calibration failed, using %i workers: %s", self.workers, e)
+
+    def read_csv(self, arguments: argparse.Namespace) -> list[dict[str, str]]:
+        """Returns the rows of the CSV file"""
+        ######################################
+        # Create sourcefile
+        ######################################
+        csv_path: str = arguments.csv or (
+            f"{self.settings.csv_directory}{self.settings.csv_filename}"
+        )
+        source: SourceFile.sourceFile = SourceFile.csv_Source(csv_path)
+
+        ######################################
+        # Create reader
+        ######################################
+        file_reader: CSV.CSVReader = CSV.CSVReader(source_file=source)
+        return file_reader.get_clients()
+
+    def read_id_list(self, id_path: str) -> list[dict[str, str]]:
+        """Returns a file of client ids as rows in the CSV format"""
+        with open(id_path, encoding="utf-8") as id_file:
+            return [{"client_id": line.strip()} for line in id_file if line.strip()]
+
+    def read_sources(self, arguments: argparse.Namespace):
+        """Returns the rows of the CSV file and the source of the images"""
         #########################################
         # Verify that directories exist
         #########################################
@@ -233,75 +597,253 @@ class Main:
 
         self.log.info("File: Checks Complete. Starting Client Generation")
 
-        ######################################
-        # Create sourcefile
-        ######################################
-        source: SourceFile.sourceFile = SourceFile.csv_Source(
-            f"{self.settings.csv_directory}{self.settings.csv_filename}"
+        list_of_clients: list[dict[str, str]] = self.read_csv(arguments)
+
+        # The images directory may also be a zip or tar archive
+        try:
+            image_source: Image.imageSource = Image.open_image_source(self.settings.images_path)
+        except ValueError as e:
+            self.log.critical("FILE: Unable to read images: %s. Exiting program", e)
+            sys.exit()
+        self.log.info(
+            "FILE: Indexed %i images in %s", len(image_source.members), image_source.location
         )
 
-        ######################################
-        # Create reader
-        ######################################
-        file_reader: CSV.CSVReader = CSV.CSVReader(source_file=source)
-        list_of_clients = file_reader.get_clients()
+        return list_of_clients, image_source
 
-        ######################################
-        # Create users
-        #####################################
-        # For each dictionary in the list
-        # log details and create a user object
-        user_list = self.create_student_list(list_of_clients, self.settings.images_path)
+    def apply_cached_canvas_ids(self, user_list: list[Clients.client]) -> None:
+        """Use the canvas ids found by previous runs to skip their lookup"""
+        journal: dict[str, dict] = Journal.OutcomeJournal.load_latest(
+            self.settings.cache_directory, self.settings.domain
+        )
 
-        # Now that users have been created upload them to canvas
-        # if no users have been created. Then EXIT the program
-        if len(user_list) > 0:
-            self.log.info(
-                "All possible users have been created. A total of %i", len(user_list)
-            )
-            self.log.info("Creating canvas object...")
-        else:
-            self.log.warning("USER: no users were found. Exiting..")
-            exit()
+        for user in user_list:
+            canvas_id = journal.get(user.sis_id, {}).get("canvas_id")
+            if canvas_id is not None:
+                user.client_id = canvas_id
+                user.canvas_id = canvas_id
+
+    def plan_run(self, user_list: list[Clients.client]) -> None:
+        """Log the estimated work and duration of the run"""
+        planner = Planner.RunPlanner(
+            self.settings.cache_directory,
+            self.settings.domain,
+            self.settings.reuse_existing_files,
+        )
+        run_plan: Planner.runPlan = planner.plan(user_list)
 
-        #########################################
-        # Create and initialise canvas connector
-        #########################################
+        # Measure the latency to canvas, the previous run is used if it cannot be reached
         try:
-            #  Attempt to connect to canvas
             connector = Canvas.POST_data_canvas(
-                self.settings.access_token, self.settings.domain
+                [self.settings.access_token, *self.settings.access_tokens],
+                self.settings.domain,
             )
-
+            planner.probe(connector, run_plan)
+            connector.close()
         except Exception as e:
-            # If error is reported in connecting to canvas
-            self.log.critical("CONNECTOR: Error connecting to canvas: %s", e)
-            exit()
+            self.log.warning("PLAN: Could not probe canvas: %s", e)
+
+        self.log.info("PLAN: Estimated run")
+        for line in planner.report(run_plan):
+            self.log.info("PLAN: %s", line)
+
+    def reset_avatars(self, arguments: argparse.Namespace) -> None:
+        """Reset the avatars of the users in the CSV or id list"""
+        # Variables
+        user_list: list[Clients.client] = []
+        # Only ids journaled for this domain are trusted, a reset deletes files
+        file_ids: dict[str, set] = Journal.OutcomeJournal.load_file_ids(
+            self.settings.cache_directory, self.settings.domain
+        )
 
-        self.log.info("Successfully created canvas connection. Commencing upload.")
+        rows = self.read_id_list(arguments.ids) if arguments.ids else self.read_csv(arguments)
+
+        # Users are reset by id alone, no image is needed
+        for row in rows:
+            client_id: str = (row.get("client_id") or "").strip()
+            if not client_id:
+                continue
+
+            user = Clients.client(client_id, None)
+            user.priority = self.get_priority(row)
+            image_names: set = {row["image_filename"]} if row.get("image_filename") else set()
+            self.reset_targets[user.sis_id] = (image_names, file_ids.get(user.sis_id, set()))
+            user_list.append(user)
+
+        if not user_list:
+            self.log.warning("USER: no users were found. Exiting..")
+            return
+
+        self.log.info("RESET: Resetting the avatars of %i users", len(user_list))
+        self.apply_cached_canvas_ids(user_list)
+
+        connector: Canvas.POST_data_canvas = self.create_connector()
+        self.calibrate_workers(connector, user_list)
+        self.run_users(user_list, connector, self.reset_user, "RESET")
+        connector.close()
+
+    def reset_user(self, user: Clients.client, connector: Canvas.POST_data_canvas) -> bool:
+        """Reset a user's avatar and delete their uploaded pictures, returns True on success"""
+        image_names, file_ids = self.reset_targets.get(user.sis_id, (set(), set()))
+
+        with connector.tracer.trace("reset", sis_id=user.sis_id) as trace_span:
+            try:
+                if user.canvas_id is None:
+                    connector.get_canvas_id(user)
+
+                if not connector.reset_avatar(user):
+                    raise RuntimeError("avatar could not be reset")
+
+                deleted: int = connector.delete_uploaded_files(user, image_names, file_ids)
+            except Exception as e:
+                self.log.error("Could not reset user: %s - %s", user.sis_id, e)
+                self.skipped_users.append(user)
+                trace_span["outcome"] = "failed"
+                if self.journal:
+                    self.journal.record(user, "reset_failed", error=str(e))
+                return False
+
+            trace_span["outcome"] = "reset"
+            if self.journal:
+                self.journal.record(user, "reset", deleted_files=deleted)
+            return True
+
+    def get_deadline(self) -> datetime:
+        """Returns the time after which no new users are started, or None"""
+        if not self.settings.deadline:
+            return None
+
+        deadline_time = datetime.strptime(str(self.settings.deadline), "%H:%M").time()
+        deadline = datetime.combine(datetime.now().date(), deadline_time)
+
+        # A deadline earlier than now is the end of a window past midnight
+        if deadline <= datetime.now():
+            deadline += timedelta(days=1)
+
+        return deadline
+
+    def request_stop(self, signal_number: int, _frame) -> None:
+        """Signal handler, stops new users from being started. A second signal exits"""
+        if self.stop_requested.is_set():
+            # In-flight requests have no timeout, so waiting for them may never end
+            self.log.critical(
+                "Received %s again. Exiting without waiting for in-flight users",
+                signal.Signals(signal_number).name,
+            )
+            if self.journal:
+                self.journal.flush()
+            os._exit(128 + signal_number)
+
+        self.log.warning(
+            "Received %s. Finishing in-flight users, queued users will not be started",
+            signal.Signals(signal_number).name,
+        )
+        self.stop_requested.set()
+
+    def run_users(
+        self,
+        user_list: list[Clients.client],
+        connector: Canvas.POST_data_canvas,
+        task,
+        label: str,
+    ) -> None:
+        """
+        Run task(user, connector) for all users and log the skipped users.
+        task returns True on success, label names the run in the log
+        """
+        # Variables
+        deadline: datetime = self.get_deadline()
+        progress = Logger.ProgressLine(len(user_list), label)
+        not_started: list[Clients.client] = []
+
+        self.log.info("Commencing %s.", label.lower())
+        if deadline:
+            self.log.info("No new users will be started after %s", deadline)
+
+        # Interrupts stop new work instead of abandoning the run
+        previous_handlers = {
+            signal_number: signal.signal(signal_number, self.request_stop)
+            for signal_number in (signal.SIGINT, signal.SIGTERM)
+        }
+        self.journal = Journal.OutcomeJournal(
+            self.settings.cache_directory, self.settings.domain
+        )
 
         ########################################
         # For each user Start upload process
         ########################################
-        with ThreadPoolExecutor(max_workers=10) as executor:
-            
-            # For each student in user list upload data to canvas
-            # Make sure enumerate starts at 1
-
-            # Call function to process a user
-            future_tasks = [executor.submit(self.process_user, user, connector) for user in user_list]
-
-            for future in future_tasks:
-                future.result()
-        
-        # Log the skipped users    
+        # Users wait in a priority queue, lowest priority value first.
+        # The position in the CSV keeps equal priorities in file order
+        queue: list = [(user.priority, position, user) for position, user in enumerate(user_list)]
+        heapq.heapify(queue)
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+
+                future_tasks: dict = {}
+                pending: set = set()
+                stopping: bool = False
+
+                # Handle users as they finish rather than in submission order
+                while queue or pending:
+                    if not stopping and (
+                        self.stop_requested.is_set()
+                        or (deadline and datetime.now() >= deadline)
+                    ):
+                        stopping = True
+                        self.log.warning("%s: Stopping, queued users are cancelled", label)
+                        for future in pending:
+                            future.cancel()
+                        not_started.extend(user for _, _, user in sorted(queue))
+                        queue.clear()
+
+                    # Only a few users are handed to the executor at a time,
+                    # so the queue decides the order users are started in
+                    while queue and len(pending) < self.workers * 2:
+                        _, _, user = heapq.heappop(queue)
+                        future = executor.submit(task, user, connector)
+                        future_tasks[future] = user
+                        pending.add(future)
+
+                    finished, pending = wait(
+                        pending, timeout=self.PROGRESS_INTERVAL, return_when=FIRST_COMPLETED
+                    )
+
+                    for future in finished:
+                        if future.cancelled():
+                            not_started.append(future_tasks[future])
+                            continue
+                        progress.completed(future.result())
+
+                    progress.render(sum(1 for future in pending if future.running()))
+        finally:
+            progress.finish()
+
+            for user in not_started:
+                self.journal.record(user, "not_started")
+            self.journal.close()
+
+            for signal_number, handler in previous_handlers.items():
+                signal.signal(signal_number, handler)
+
+        connector.stats.save(self.settings.cache_directory, self.settings.domain)
+
+        if not_started:
+            self.log.warning(
+                "%s: %i users were not started, see %s",
+                label,
+                len(not_started),
+                self.journal.journal_path,
+            )
+
+        # Log the skipped users
         self.log.info("The following users were skipped:")
         for count, user in enumerate(self.skipped_users):
             # Log the skipped users
             self.log.error(
                 "%i : %s",
-                count, 
-                user.client_id
+                count,
+                user.sis_id
             )
 
 if __name__ == "__main__":
@@ -314,4 +856,4 @@ if __name__ == "__main__":
 
     # If module is run by itself then run main
     main_object: object = Main()  # Create main object
-    main_object.main()  # Run main from object
+    main_object.main(parse_arguments())  # Run main from object
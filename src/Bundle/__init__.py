@@ -0,0 +1,7 @@
+# -------------------------
+# init file for bundle module
+
+# imports
+
+# local imports
+from .bundle import bundleWriter, bundle_Source
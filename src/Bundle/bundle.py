@@ -0,0 +1,155 @@
+'''
+    Date:   19/10/2026
+    Purpose:
+        Packs validated users and their images into a single
+        indexed bundle file, so the slow preparation can be done
+        ahead of the upload. The bundle is memory mapped when
+        pushed and acts as the image source for the upload.
+
+        Layout:
+            header  - magic, version, index offset and index length
+            blobs   - the image contents, one after another
+            index   - JSON with the rows and the location of each image
+'''
+
+# External imports
+import hashlib
+import io
+import json
+import logging
+import mmap
+import mimetypes
+import os
+import struct
+import time
+from typing import BinaryIO
+
+# Internal imports
+from src.Image.sources import imageSource
+
+
+MAGIC = b"COCBUNDL"
+VERSION = 1
+HEADER = struct.Struct("<8sIQQ")
+
+# Image types accepted by canvas for avatars
+SUPPORTED_TYPES = {"image/png", "image/jpeg", "image/gif"}
+
+
+class bundleWriter():
+    ''' Validates users and writes them to a bundle file '''
+
+    def __init__(self, bundle_path: str) -> None:
+        self.bundle_path: str = bundle_path
+        self.log: logging.Logger = logging.getLogger(__name__)
+
+    def validate(self, row: dict[str, str], source: imageSource) -> str:
+        ''' Returns the MIME type of a valid row, None if it is invalid '''
+        client_id: str = (row.get("client_id") or "").strip()
+        image_name: str = (row.get("image_filename") or "").strip()
+
+        if not client_id:
+            self.log.error("BUNDLE: Row has no client id: %s", row)
+            return None
+        if not source.exists(image_name):
+            self.log.error("BUNDLE: Image %s for user %s not found", image_name, client_id)
+            return None
+
+        # Prefer the type in the csv, falling back to the file extension
+        file_type: str = (row.get("image_filetype") or "").strip().lower()
+        mime_type: str = f"image/{file_type}" if file_type else mimetypes.guess_type(image_name)[0]
+        if mime_type == "image/jpg":
+            mime_type = "image/jpeg"
+        if mime_type not in SUPPORTED_TYPES:
+            self.log.error("BUNDLE: Image %s has unsupported type %s", image_name, mime_type)
+            return None
+
+        return mime_type
+
+    def write(self, client_list: list[dict[str, str]], source: imageSource) -> int:
+        ''' Writes the bundle, returns the number of rows written '''
+        # Variables
+        rows: list[dict] = []
+        images: dict[str, dict] = {}
+        temporary_path: str = f"{self.bundle_path}.partial"
+
+        with open(temporary_path, "wb") as bundle_file:
+            # Reserve the header, it is written once the index is known
+            bundle_file.write(b"\0" * HEADER.size)
+
+            for row in client_list:
+                mime_type: str = self.validate(row, source)
+                if mime_type is None:
+                    continue
+
+                image_name: str = row["image_filename"].strip()
+
+                # Images shared by several users are only stored once
+                if image_name not in images:
+                    contents: bytes = source.read_member(image_name)
+                    images[image_name] = {
+                        "offset": bundle_file.tell(),
+                        "size": len(contents),
+                        "md5": hashlib.md5(contents).hexdigest(),
+                        "content_type": mime_type,
+                    }
+                    bundle_file.write(contents)
+
+                # Extra columns are kept, they can set the user's priority
+                rows.append({
+                    **row,
+                    "client_id": row["client_id"].strip(),
+                    "image_filename": image_name,
+                })
+
+            index: bytes = json.dumps(
+                {"created": time.time(), "rows": rows, "images": images}
+            ).encode("utf-8")
+            index_offset: int = bundle_file.tell()
+            bundle_file.write(index)
+
+            bundle_file.seek(0)
+            bundle_file.write(HEADER.pack(MAGIC, VERSION, index_offset, len(index)))
+
+        # Only replace an existing bundle once the new one is complete
+        os.replace(temporary_path, self.bundle_path)
+        self.log.info(
+            "BUNDLE: Wrote %i users and %i images to %s",
+            len(rows), len(images), self.bundle_path,
+        )
+        return len(rows)
+
+
+class bundle_Source(imageSource):
+    ''' Images and users read from a prepared bundle '''
+
+    def __init__(self, location: str) -> None:
+        self.location: str = location
+        self._file = open(location, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, index_offset, index_length = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"Not a supported bundle file: {location}")
+
+        index: dict = json.loads(self._map[index_offset:index_offset + index_length])
+        self.rows: list[dict[str, str]] = index["rows"]
+        self.images: dict[str, dict] = index["images"]
+        self.members: dict[str, int] = {
+            name: details["size"] for name, details in self.images.items()
+        }
+
+    def _open_member(self, member: str) -> BinaryIO:
+        details: dict = self.images[member]
+        return io.BytesIO(self._map[details["offset"]:details["offset"] + details["size"]])
+
+    def content_type(self, image_name: str) -> str:
+        return self.images[self.resolve(image_name)]["content_type"]
+
+    def md5(self, image_name: str) -> str:
+        return self.images[self.resolve(image_name)]["md5"]
+
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
@@ -4,4 +4,10 @@
 # import 
 
 # Local imports
-from .canvas_requests import Canvas_connector, POST_data_canvas
\ No newline at end of file
+from .canvas_requests import Canvas_connector, POST_data_canvas
+from .pagination import Paginator
+from .token_pool import TokenPool
+from .stats import requestStats
+from .calibration import ConcurrencyCalibrator
+from .transport import http2Transport, benchmark_transports
+from .bandwidth import BandwidthLimiter
\ No newline at end of file
@@ -0,0 +1,122 @@
+"""
+    Date:   19/10/2026
+    Purpose:
+        Caps the bandwidth used by file uploads. All uploads share
+        one token bucket, and the rate can follow a time of day
+        schedule, EG: 5MB/s during school hours and unlimited at night.
+"""
+
+# External imports
+import re
+import threading
+import time
+from datetime import datetime
+
+# Internal imports
+
+
+# Multipliers for the units a rate can be written in
+UNITS = {"": 1, "B": 1, "KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3}
+
+
+def parse_rate(rate) -> int:
+    """Returns a rate such as 5MB, 500KB or 1000 in bytes per second, 0 is unlimited"""
+    if rate is None:
+        return 0
+    if isinstance(rate, (int, float)):
+        return int(rate)
+
+    match = re.fullmatch(r"\s*([\d.]+)\s*([KMG]?B)?(?:/S)?\s*", str(rate).upper())
+    if not match:
+        raise ValueError(f"Invalid bandwidth rate: {rate}")
+    return int(float(match.group(1)) * UNITS[match.group(2) or ""])
+
+
+class BandwidthLimiter():
+    """Token bucket shared by every upload"""
+
+    # Seconds of transfer that can be sent in a burst
+    BURST_SECONDS = 1.0
+
+    def __init__(self, limit=0, schedule: list[dict] = None) -> None:
+        """
+        limit is the rate outside the schedule. Each schedule entry has
+        a start and end time (HH:MM) and the limit during that window
+        """
+        self.limit: int = parse_rate(limit)
+        self.schedule: list[tuple] = [
+            (
+                datetime.strptime(str(window["start"]), "%H:%M").time(),
+                datetime.strptime(str(window["end"]), "%H:%M").time(),
+                parse_rate(window.get("limit")),
+            )
+            for window in schedule or []
+        ]
+
+        self._lock = threading.Lock()
+        self._tokens: float = 0.0
+        self._last_refill: float = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.limit or self.schedule)
+
+    def current_limit(self) -> int:
+        """Bytes per second allowed now, 0 is unlimited"""
+        now = datetime.now().time()
+
+        for start, end, limit in self.schedule:
+            # A window ending before it starts runs past midnight
+            if start <= end:
+                in_window: bool = start <= now < end
+            else:
+                in_window = now >= start or now < end
+            if in_window:
+                return limit
+
+        return self.limit
+
+    def consume(self, size: int) -> None:
+        """Wait until size bytes may be sent"""
+        rate: int = self.current_limit()
+        if not rate:
+            return
+
+        with self._lock:
+            now: float = time.monotonic()
+            capacity: float = rate * self.BURST_SECONDS
+            self._tokens = min(capacity, self._tokens + (now - self._last_refill) * rate)
+            self._last_refill = now
+
+            # Borrow against the bucket, then wait for it to refill
+            self._tokens -= size
+            wait: float = -self._tokens / rate if self._tokens < 0 else 0.0
+
+        if wait:
+            time.sleep(wait)
+
+    def wrap(self, body: bytes) -> "throttledBody":
+        """Returns the body as a stream that is read at the allowed rate"""
+        return throttledBody(body, self)
+
+
+class throttledBody():
+    """Request body read through a bandwidth limiter"""
+
+    def __init__(self, body: bytes, limiter: BandwidthLimiter) -> None:
+        self._body = memoryview(body)
+        self._position: int = 0
+        self._limiter: BandwidthLimiter = limiter
+
+    def __len__(self) -> int:
+        # Lets requests send a Content-Length instead of chunking
+        return len(self._body)
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = len(self._body) - self._position
+
+        chunk: bytes = self._body[self._position:self._position + size].tobytes()
+        self._position += len(chunk)
+        self._limiter.consume(len(chunk))
+        return chunk
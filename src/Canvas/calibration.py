@@ -0,0 +1,126 @@
+"""
+    Date:   19/10/2026
+    Purpose:
+        Chooses the number of workers for a run. Concurrency is
+        ramped up on SIS id lookups for the first users while the
+        throughput and rate limit budget are measured, and the
+        chosen value is kept for each domain so later runs start
+        from it.
+"""
+
+# External imports
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Internal imports
+from src.Clients import client
+
+
+class ConcurrencyCalibrator():
+    """Ramps concurrency on read-only requests to choose the worker count"""
+
+    # Worker counts tried, in order. The top level matches the connection pool
+    LEVELS = (2, 4, 8, 16, 32)
+    # Lookups made by each worker at a level
+    LOOKUPS_PER_WORKER = 2
+    # Throughput must improve by this factor to keep ramping
+    MIN_GAIN = 1.15
+    # Rate limit budget below which ramping stops
+    LOW_BUDGET = 200.0
+
+    # Name of the calibration file within the cache directory
+    CALIBRATION_FILENAME = "calibration.json"
+
+    def __init__(self, connector, cache_directory: str) -> None:
+        self.connector = connector
+        self.cache_directory: str = cache_directory
+        self.calibration_path: str = f"{cache_directory}{self.CALIBRATION_FILENAME}"
+        self.log: logging.Logger = logging.getLogger(__name__)
+
+    def calibrate(self, user_list: list[client], default: int) -> int:
+        """Returns the worker count for the run, looking up canvas ids as it measures"""
+        # Variables
+        stored: int = self.load().get("workers")
+        levels: list[int] = self.levels(stored)
+        users = iter([user for user in user_list if user.canvas_id is None])
+        chosen: int = stored or default
+        best_rate: float = 0.0
+        # Whether any level was measured, an unmeasured run is not stored
+        measured: bool = False
+
+        for workers in levels:
+            batch: list[client] = [
+                user for _, user in zip(range(workers * self.LOOKUPS_PER_WORKER), users)
+            ]
+            if len(batch) < workers * self.LOOKUPS_PER_WORKER:
+                # Too few users left to measure this level
+                self.log.info("CALIBRATE: Not enough users to measure %i workers", workers)
+                break
+
+            throttled_before: int = self.connector.tokens.throttled
+            start: float = time.monotonic()
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(self._lookup, batch))
+            rate: float = len(batch) / (time.monotonic() - start)
+            budget: float = self.connector.tokens.lowest_budget()
+
+            self.log.info(
+                "CALIBRATE: %i workers, %.1f lookups/s, rate limit budget %s",
+                workers, rate, "unknown" if budget is None else f"{budget:.0f}",
+            )
+
+            # Stop before canvas starts throttling the run
+            if self.connector.tokens.throttled > throttled_before:
+                self.log.info("CALIBRATE: Throttled at %i workers", workers)
+                if not measured:
+                    # The first level is already too many, step down below it
+                    chosen, measured = max(1, workers // 2), True
+                break
+            if rate < best_rate * self.MIN_GAIN:
+                break
+
+            chosen, best_rate, measured = workers, rate, True
+            if budget is not None and budget < self.LOW_BUDGET:
+                self.log.info("CALIBRATE: Rate limit budget is low at %i workers", workers)
+                break
+
+        if measured:
+            self.save(chosen, best_rate)
+        self.log.info("CALIBRATE: Using %i workers", chosen)
+        return chosen
+
+    def levels(self, stored: int) -> list[int]:
+        """Levels to try, starting from the stored value when there is one"""
+        if not stored:
+            return list(self.LEVELS)
+        return [stored] + [level for level in self.LEVELS if level > stored]
+
+    def _lookup(self, user: client) -> None:
+        """Look up a user's canvas id, failures are left for the run to report"""
+        try:
+            self.connector.get_canvas_id(user)
+        except Exception:
+            pass
+
+    def load(self) -> dict:
+        """Returns the stored calibration for the domain"""
+        if not os.path.exists(self.calibration_path):
+            return {}
+        with open(self.calibration_path, encoding="utf-8") as calibration_file:
+            return json.load(calibration_file).get(self.connector.host, {})
+
+    def save(self, workers: int, rate: float) -> None:
+        """Store the chosen worker count for the domain"""
+        recorded: dict = {}
+        if os.path.exists(self.calibration_path):
+            with open(self.calibration_path, encoding="utf-8") as calibration_file:
+                recorded = json.load(calibration_file)
+
+        recorded[self.connector.host] = {"workers": workers, "rate": rate, "time": time.time()}
+
+        os.makedirs(self.cache_directory, exist_ok=True)
+        with open(self.calibration_path, "w", encoding="utf-8") as calibration_file:
+            json.dump(recorded, calibration_file, indent=4)
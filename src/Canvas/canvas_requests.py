@@ -8,12 +8,24 @@
 
 # External imports
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
 import json
 import logging
+import re
+import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import encode_multipart_formdata
 
 # Internal imports
+from src.Canvas.bandwidth import BandwidthLimiter
+from src.Canvas.pagination import Paginator
+from src.Canvas.stats import requestStats
+from src.Canvas.token_pool import TokenPool
+from src.Canvas.transport import http2Transport
 from src.Clients import client
+from src.Tracing import Tracer
 
 
 class Canvas_connector(ABC):
@@ -31,21 +43,75 @@ class Canvas_connector(ABC):
     def set_image_as_avatar(self, user: client) -> bool:
         """Sets and image to be a users PFP"""
 
+    @abstractmethod
+    def verify_avatar(self, user: client) -> bool:
+        """Checks the user's current avatar is their uploaded image"""
+
+    @abstractmethod
+    def reset_avatar(self, user: client) -> bool:
+        """Sets a user's avatar back to the default"""
+
 
 class POST_data_canvas(Canvas_connector):
     """Posts data to canvas"""
 
-    def __init__(self, Token: str, domain: str) -> None:
-        """For passing information to canvas"""
+    # Folder in each user's files that avatars are uploaded to
+    PROFILE_FOLDER = "profile pictures"
+
+    # Avatar urls for uploaded files reference the file id
+    AVATAR_FILE_ID = re.compile(r"/thumbnails/(\d+)/")
+
+    # Connections kept open to the canvas host
+    POOL_SIZE = 32
+    # Threads used to prefetch the pages of list endpoints
+    PAGE_WORKERS = 4
+    # Multiplexed connections used by the HTTP/2 transport
+    HTTP2_CONNECTIONS = 2
+
+    def __init__(
+        self,
+        Token,
+        domain: str,
+        reuse_existing_files: bool = False,
+        per_page: int = 100,
+        tracer: Tracer = None,
+        http2: bool = False,
+        bandwidth: BandwidthLimiter = None,
+    ) -> None:
+        """For passing information to canvas. Token may be a list of tokens"""
+        # A shared session reuses connections across all workers
         self.Session = requests.Session()
-        # TODO: implement the sessions system from requests, to save on request information
-        self.Auth_token: str = Token
+        self.Session.mount(
+            "https://", HTTPAdapter(pool_connections=4, pool_maxsize=self.POOL_SIZE)
+        )
+        # API requests can instead share a few HTTP/2 connections.
+        # Uploads to upload_url always use their own HTTP/1.1 requests
+        self.http2: bool = http2
+        self.transport = (
+            http2Transport(self.HTTP2_CONNECTIONS) if http2 else self.Session
+        )
+        # Requests are spread across every token, canvas limits each separately
+        self.tokens = TokenPool([Token] if isinstance(Token, str) else list(Token))
+        self.Auth_token: str = self.tokens.tokens[0].token
+        self.host: str = domain
         self.domain: str = f"https://{domain}/api/v1"
+        self.stats = requestStats()
+        # Tracing is disabled unless a tracer is passed in
+        self.tracer: Tracer = tracer or Tracer()
         self.header: dict = {"Authorization": f"Bearer {self.Auth_token}"}
         self.params: dict = {}
         self.upload_params: dict = {}
-
-        self.Session.headers.update()
+        self.reuse_existing_files: bool = reuse_existing_files
+        # Uploads are unlimited unless a limiter is passed in
+        self.bandwidth: BandwidthLimiter = bandwidth or BandwidthLimiter()
+
+        self.paginator = Paginator(
+            self._request,
+            per_page=per_page,
+            executor=ThreadPoolExecutor(max_workers=self.PAGE_WORKERS),
+            prefetch=self.PAGE_WORKERS,
+            tracer=self.tracer,
+        )
 
         # Logger instance
         self.log: logging.Logger = logging.getLogger(__name__)
@@ -54,20 +120,69 @@ class POST_data_canvas(Canvas_connector):
         self.log.info(
             "CANVAS: initialised values:\n" +
             f"Auth Token:\t {self.Auth_token}\n" +
+            f"Access tokens:\t {len(self.tokens)}\n" +
             f"Domain:\t {self.domain}\n" +
             f"Header:\t {self.header}\n" +
-            f"Params:\t {self.params}\n"
+            f"Params:\t {self.params}\n" +
+            f"Reuse existing files:\t {self.reuse_existing_files}\n" +
+            f"HTTP/2:\t {self.http2}\n" +
+            f"Bandwidth limit:\t {self.bandwidth.enabled}\n"
         )
         # Call Canvas Test function
         self.test_canvas_connection()
 
+    def _request(
+        self, method: str, url: str, span: str = "request", **kwargs
+    ) -> requests.Response:
+        """Sends an authenticated request to the canvas API, span names it in traces"""
+        extra_headers: dict = kwargs.pop("headers", {})
+
+        with self.tracer.span(span, method=method) as trace_span:
+            # A request refused for its token is retried once on each other token
+            for attempt in range(len(self.tokens)):
+                token = self.tokens.acquire()
+                # The token is only sent to canvas, never to upload urls
+                headers: dict = {**token.header, **extra_headers}
+                request_start: float = time.monotonic()
+                try:
+                    response: requests.Response = self.transport.request(
+                        method, url, headers=headers, **kwargs
+                    )
+                except Exception:
+                    self.tokens.release(token, None)
+                    raise
+
+                # Timed here as the transports report elapsed time differently
+                self.stats.record_request(time.monotonic() - request_start)
+
+                if self.tokens.release(token, response):
+                    break
+
+            trace_span["status"] = response.status_code
+            trace_span["bytes"] = len(response.content)
+            trace_span["attempts"] = attempt + 1
+
+        return response
+
+    def close(self) -> None:
+        """Close the connections, page workers and trace file of the connector"""
+        self.paginator.executor.shutdown(wait=False, cancel_futures=True)
+        if self.http2:
+            self.transport.close()
+        self.Session.close()
+        self.tracer.close()
+
+    def paginate(self, url: str, params: dict = None, span: str = "page"):
+        """Yields every item of a paginated canvas list endpoint"""
+        return self.paginator.iterate(url, params, span=span)
+
     def test_canvas_connection(self):
         """Validates that connection to canvas can be made"""
         # Variables
         desired_result: int = 200
 
-        res: requests.Response = requests.get(
-            f"{self.domain}/accounts", self.params, headers=self.header
+        res: requests.Response = self._request(
+            "GET", f"{self.domain}/accounts", span="connection test", params=self.params
         )
         res.raise_for_status()
 
@@ -84,9 +199,10 @@ class POST_data_canvas(Canvas_connector):
 
         # Send get request for a user's canvas id. This is
         # different from their SIS id
-        user_Details: requests.Response = requests.get(
+        user_Details: requests.Response = self._request(
+            "GET",
             f"{self.domain}/users/sis_user_id:{user.client_id}",
-            headers=self.header,
+            span="lookup",
             params=self.params,
         )
 
@@ -94,14 +210,68 @@ class POST_data_canvas(Canvas_connector):
         if "id" in user_Details.json():
             # User ID found then change the users SIS id to match
             user.client_id = user_Details.json()["id"]
+            user.canvas_id = user.client_id
             return True
         else:
             # If not found, return an error to the log with the SIS id
             self.log.exception(f"USER: {user.client_id} cannot be found in canvas")
             user_Details.raise_for_status()
 
+    def list_profile_files(self, user: client) -> list[dict]:
+        """Lists the files in a user's profile pictures folder"""
+        # Resolve the folder, canvas returns every folder along the path
+        folders: requests.Response = self._request(
+            "GET",
+            f"{self.domain}/users/{user.client_id}/folders/by_path/{self.PROFILE_FOLDER}",
+            span="profile folder",
+        )
+
+        # Folder has not been created yet, so there is nothing to reuse
+        if folders.status_code == 404:
+            return []
+        folders.raise_for_status()
+
+        folder_id = folders.json()[-1]["id"]
+
+        return list(
+            self.paginate(f"{self.domain}/folders/{folder_id}/files", span="profile files")
+        )
+
+    def find_existing_file(self, user: client):
+        """Returns the canvas file matching the user's image, or None"""
+        # Variables
+        image_md5: str = None
+
+        for existing in self.list_profile_files(user):
+            # Name and size must both match the local image
+            if existing.get("display_name") != user.image.image_name:
+                continue
+            if existing.get("size") != user.image.image_size:
+                continue
+
+            # Only compare the hash when canvas reports one
+            if existing.get("md5"):
+                if image_md5 is None:
+                    image_md5 = user.image.md5()
+                if existing["md5"] != image_md5:
+                    continue
+
+            return existing
+
+        return None
+
     def upload_user_data(self, user: client) -> bool:
         """Upload image to users files"""
+        # Skip the upload when the same file is already in canvas
+        if self.reuse_existing_files:
+            existing = self.find_existing_file(user)
+            if existing:
+                self.log.info(
+                    "CANVAS: Reusing file %s for user %s", existing["id"], user.client_id
+                )
+                user.image.image_canvas_id = existing["id"]
+                return True
+
         # Variables
         self.upload_params = {}
         url: str = self.domain + "/users/self/files"
@@ -114,8 +284,8 @@ class POST_data_canvas(Canvas_connector):
         }
 
         # Prepare Canvas for upload
-        response: requests.Response = requests.post(
-            url, headers=self.header, data=inform_parameters
+        response: requests.Response = self._request(
+            "POST", url, span="preflight", data=inform_parameters
         )
 
         response.raise_for_status()
@@ -124,10 +294,6 @@ class POST_data_canvas(Canvas_connector):
         # # Get response and send data
         json_res = json.loads(response.text)
 
-        # Prepare data
-        # Get file data from image object
-        files = {"file": user.image.image_file}
-
         # Set the params to the params based on the response from canvas
         # These must be identical to the params received from canvas.
         # Else this will fail
@@ -138,11 +304,29 @@ class POST_data_canvas(Canvas_connector):
                 "Upload Parameters could not be set: %s. The following response was returned %s".format(e, response.text)
             )
             return False
-        # Send the file to canvas
+        # Send the file to canvas, streamed from the image source
         # Get upload confirmation
-        upload_file_response = requests.post(
-            json_res["upload_url"], data=self.upload_params, files=files, allow_redirects=False
-        )
+        with user.image.open_stream() as image_stream:
+            files = {"file": (user.image.image_name, image_stream)}
+            upload_start: float = time.monotonic()
+            with self.tracer.span("upload", method="POST", bytes=user.image.image_size) as trace_span:
+                if self.bandwidth.enabled:
+                    # Build the form here so the body is read through the limiter
+                    body, content_type = encode_multipart_formdata(
+                        [*self.upload_params.items(), ("file", (user.image.image_name, image_stream.read()))]
+                    )
+                    upload_file_response = requests.post(
+                        json_res["upload_url"],
+                        data=self.bandwidth.wrap(body),
+                        headers={"Content-Type": content_type},
+                        allow_redirects=False,
+                    )
+                else:
+                    upload_file_response = requests.post(
+                        json_res["upload_url"], data=self.upload_params, files=files, allow_redirects=False
+                    )
+                trace_span["status"] = upload_file_response.status_code
+            self.stats.record_upload(user.image.image_size, time.monotonic() - upload_start)
 
         status_code: int = upload_file_response.status_code
 
@@ -151,8 +335,8 @@ class POST_data_canvas(Canvas_connector):
         # A 201 is a confirmation and a get will return the file id
         if status_code == 201 or status_code >= 300:
             # Get file upload confirmation and file ID
-            confirmation = requests.get(
-                upload_file_response.headers["location"], headers=self.header
+            confirmation = self._request(
+                "GET", upload_file_response.headers["location"], span="confirmation"
             )
 
         else:
@@ -174,8 +358,9 @@ class POST_data_canvas(Canvas_connector):
     def set_image_as_avatar(self, user: client) -> bool:
         """Sets an image to be a user's PFP"""
 
-        # Ensure the upload parameters are correctly set
-        if not self.upload_params:
+        # Ensure the upload parameters are correctly set,
+        # unless an existing canvas file is being reused
+        if not self.upload_params and user.image.image_canvas_id is None:
             self.log.error("Upload params is empty, cannot set image avatar.")
             return False
 
@@ -183,27 +368,26 @@ class POST_data_canvas(Canvas_connector):
         self.log.info(f"Setting canvas Avatar for: {user.client_id} To: {user.image.image_name}")
 
         # Fetch the avatar options for the user (without using as_user_id unnecessarily)
-        avatar_options = requests.get(
-            f"{self.domain}/users/{user.client_id}/avatars",
-            headers=self.header,
-        )
-        
-        avatar_options.raise_for_status()
-
-        # Iterate through the avatars to find the matching uploaded image
+        # Pages are only requested until the matching avatar is found,
+        # closing the listing cancels the pages fetched ahead
         token = None
-        for avatar_opt in avatar_options.json():
-            if avatar_opt.get("display_name") == user.image.image_name:
-                token = avatar_opt.get("token")
-                break
+        with closing(self.paginate(
+            f"{self.domain}/users/{user.client_id}/avatars", span="avatars list"
+        )) as avatar_options:
+            # Iterate through the avatars to find the matching uploaded image
+            for avatar_opt in avatar_options:
+                if avatar_opt.get("display_name") == user.image.image_name:
+                    token = avatar_opt.get("token")
+                    break
 
         # If the token is found, proceed to update the avatar
         if token:
             self.log.info(f"Avatar token found for: {user.client_id}, setting image as avatar.")
             # Update the avatar for the specific user
-            set_avatar_user = requests.put(
+            set_avatar_user = self._request(
+                "PUT",
                 f"{self.domain}/users/{user.client_id}",
-                headers=self.header,
+                span="set avatar",
                 params={"user[avatar][token]": token},
             )
             set_avatar_user.raise_for_status()
@@ -216,4 +400,79 @@ class POST_data_canvas(Canvas_connector):
 
         # Log and return false if the avatar was not updated
         self.log.error(f"Failed to update avatar for user {user.client_id}")
-        return False
\ No newline at end of file
+        return False
+
+    def verify_avatar(self, user: client) -> bool:
+        """Checks the user's current avatar is their uploaded image"""
+        # Users verified on their own have not been looked up yet
+        if user.canvas_id is None:
+            self.get_canvas_id(user)
+
+        # Use the file id from this run, otherwise find the file in canvas
+        expected_id = user.image.image_canvas_id
+        if expected_id is None:
+            existing = self.find_existing_file(user)
+            if existing is None:
+                self.log.error(f"VERIFY: No uploaded file found for user {user.sis_id}")
+                return False
+            expected_id = existing["id"]
+
+        profile: requests.Response = self._request(
+            "GET", f"{self.domain}/users/{user.canvas_id}", span="profile"
+        )
+        profile.raise_for_status()
+
+        # Compare the file referenced by the avatar with the expected file
+        match = self.AVATAR_FILE_ID.search(profile.json().get("avatar_url") or "")
+        if match and int(match.group(1)) == int(expected_id):
+            self.log.info(f"VERIFY: Avatar confirmed for user {user.sis_id}")
+            return True
+
+        self.log.error(
+            f"VERIFY: Avatar for user {user.sis_id} does not match file {expected_id}"
+        )
+        return False
+
+    def reset_avatar(self, user: client) -> bool:
+        """Sets a user's avatar back to the default"""
+        # The default avatar is offered as the 'no_pic' option
+        token = None
+        with closing(self.paginate(
+            f"{self.domain}/users/{user.client_id}/avatars", span="avatars list"
+        )) as avatar_options:
+            for avatar_opt in avatar_options:
+                if avatar_opt.get("type") == "no_pic":
+                    token = avatar_opt.get("token")
+                    break
+
+        if not token:
+            self.log.error(f"RESET: No default avatar offered for user {user.sis_id}")
+            return False
+
+        reset_avatar_user = self._request(
+            "PUT",
+            f"{self.domain}/users/{user.client_id}",
+            span="reset avatar",
+            params={"user[avatar][token]": token},
+        )
+        reset_avatar_user.raise_for_status()
+
+        self.log.info(f"RESET: Avatar reset for user {user.sis_id}")
+        return True
+
+    def delete_uploaded_files(self, user: client, file_names: set, file_ids: set) -> int:
+        """Deletes the user's profile pictures with the given names or ids, returns the number deleted"""
+        # Only files this program uploaded are removed
+        to_delete: list[dict] = [
+            existing for existing in self.list_profile_files(user)
+            if existing.get("display_name") in file_names or existing.get("id") in file_ids
+        ]
+
+        for existing in to_delete:
+            deleted = self._request(
+                "DELETE", f"{self.domain}/files/{existing['id']}", span="delete file"
+            )
+            deleted.raise_for_status()
+            self.log.info(f"RESET: Deleted file {existing['id']} for user {user.sis_id}")
+
+        return len(to_delete)
@@ -0,0 +1,119 @@
+"""
+    Date:   19/10/2026
+    Purpose:
+        Follows the pages of canvas list endpoints and streams
+        the items. Pages are fetched in parallel when canvas
+        reports the number of the last page.
+"""
+
+# External imports
+from collections import deque
+from concurrent.futures import Executor
+from typing import Callable, Iterator
+from urllib.parse import parse_qs, urlencode, urlparse, urlunparse
+
+import requests
+
+# Internal imports
+from src.Tracing import Tracer
+
+
+class Paginator():
+    """Streams the items of a paginated canvas list endpoint"""
+
+    def __init__(
+        self,
+        request: Callable[..., requests.Response],
+        per_page: int = 100,
+        executor: Executor = None,
+        prefetch: int = 4,
+        tracer: Tracer = None,
+    ) -> None:
+        """request is called as request(method, url, **kwargs) for each page"""
+        self.request = request
+        self.per_page: int = per_page
+        self.executor: Executor = executor
+        self.prefetch: int = prefetch
+        # Prefetched pages are traced as part of the caller's trace
+        self.tracer: Tracer = tracer or Tracer()
+
+    def iterate(self, url: str, params: dict = None, **request_kwargs) -> Iterator[dict]:
+        """Yields every item from the endpoint, in page order. Extra arguments go to request"""
+        params = dict(params or {})
+        params.setdefault("per_page", self.per_page)
+
+        first_page: requests.Response = self.get_page(url, params, **request_kwargs)
+        yield from first_page.json()
+
+        next_url: str = first_page.links.get("next", {}).get("url")
+        last_page: int = self.page_number(first_page.links.get("last", {}).get("url"))
+
+        # Numbered pages can be requested ahead of time
+        if next_url and last_page and self.executor and self.page_number(next_url):
+            yield from self._prefetch_pages(
+                next_url, self.page_number(next_url), last_page, request_kwargs
+            )
+            return
+
+        # Otherwise follow the next links one page at a time
+        while next_url:
+            page: requests.Response = self.get_page(next_url, **request_kwargs)
+            yield from page.json()
+            next_url = page.links.get("next", {}).get("url")
+
+    def get_page(self, url: str, params: dict = None, **request_kwargs) -> requests.Response:
+        """Request a single page"""
+        page: requests.Response = self.request("GET", url, params=params, **request_kwargs)
+        page.raise_for_status()
+        return page
+
+    def _prefetch_pages(
+        self, page_url: str, first: int, last: int, request_kwargs: dict
+    ) -> Iterator[dict]:
+        """Fetch pages first..last in parallel, keeping a window in flight"""
+        page_numbers = iter(range(first, last + 1))
+        in_flight: deque = deque()
+
+        # Traces are per thread, so the pages carry the caller's trace to the executor
+        get_page = self.tracer.bind(self.get_page)
+
+        def submit(page: int):
+            return self.executor.submit(
+                get_page, self.with_page(page_url, page), **request_kwargs
+            )
+
+        # Fill the window, then top it up as each page is consumed
+        for page in page_numbers:
+            in_flight.append(submit(page))
+            if len(in_flight) >= self.prefetch:
+                break
+
+        try:
+            while in_flight:
+                response: requests.Response = in_flight.popleft().result()
+                page = next(page_numbers, None)
+                if page is not None:
+                    in_flight.append(submit(page))
+                yield from response.json()
+        finally:
+            # The caller stopped early, pages not yet started are not requested
+            for future in in_flight:
+                future.cancel()
+
+    @staticmethod
+    def page_number(url: str) -> int:
+        """Returns the numbered page of a link, None for bookmarks"""
+        if not url:
+            return None
+        page: list[str] = parse_qs(urlparse(url).query).get("page", [])
+        if page and page[0].isdigit():
+            return int(page[0])
+        return None
+
+    @staticmethod
+    def with_page(url: str, page: int) -> str:
+        """Returns the url with its page parameter replaced"""
+        parts = urlparse(url)
+        query: dict = parse_qs(parts.query)
+        query["page"] = [str(page)]
+        return urlunparse(parts._replace(query=urlencode(query, doseq=True)))
@@ -0,0 +1,87 @@
+"""
+    Date:   19/10/2026
+    Purpose:
+        Measures the latency of canvas API requests and the
+        throughput of file uploads, and keeps the figures of
+        the last run for each domain.
+"""
+
+# External imports
+import json
+import os
+import threading
+
+# Internal imports
+
+
+class requestStats():
+    """Latency and throughput measured during a run"""
+
+    # Name of the stats file within the cache directory
+    STATS_FILENAME = "run_stats.json"
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.api_requests: int = 0
+        self.api_seconds: float = 0.0
+        self.upload_count: int = 0
+        self.upload_bytes: int = 0
+        self.upload_seconds: float = 0.0
+
+    def record_request(self, seconds: float) -> None:
+        """Record the duration of an API request"""
+        with self._lock:
+            self.api_requests += 1
+            self.api_seconds += seconds
+
+    def record_upload(self, size: int, seconds: float) -> None:
+        """Record the size and duration of a file upload"""
+        with self._lock:
+            self.upload_count += 1
+            self.upload_bytes += size
+            self.upload_seconds += seconds
+
+    @property
+    def latency(self) -> float:
+        """Mean seconds per API request, None if nothing was measured"""
+        if not self.api_requests:
+            return None
+        return self.api_seconds / self.api_requests
+
+    @property
+    def upload_throughput(self) -> float:
+        """Bytes per second of a single upload, None if nothing was measured"""
+        if not self.upload_seconds:
+            return None
+        return self.upload_bytes / self.upload_seconds
+
+    def save(self, cache_directory: str, domain: str) -> None:
+        """Store the figures of this run for the domain"""
+        if not self.api_requests:
+            return
+
+        recorded: dict = self.load_all(cache_directory)
+        previous: dict = recorded.get(domain, {})
+        recorded[domain] = {
+            "latency": self.latency,
+            # Keep the last known upload figure if nothing was uploaded
+            "upload_throughput": self.upload_throughput or previous.get("upload_throughput"),
+        }
+
+        os.makedirs(cache_directory, exist_ok=True)
+        with open(f"{cache_directory}{self.STATS_FILENAME}", "w", encoding="utf-8") as stats_file:
+            json.dump(recorded, stats_file, indent=4)
+
+    @classmethod
+    def load_all(cls, cache_directory: str) -> dict:
+        """Returns the recorded figures for every domain"""
+        stats_path: str = f"{cache_directory}{cls.STATS_FILENAME}"
+        if not os.path.exists(stats_path):
+            return {}
+        with open(stats_path, encoding="utf-8") as stats_file:
+            return json.load(stats_file)
+
+    @classmethod
+    def load(cls, cache_directory: str, domain: str) -> dict:
+        """Returns the recorded figures for a domain, empty if there are none"""
+        return cls.load_all(cache_directory).get(domain, {})
@@ -0,0 +1,152 @@
+"""
+    Date:   19/10/2026
+    Purpose:
+        Spreads requests across several canvas access tokens.
+        Canvas rate limits each token separately, so the budget
+        of every token is tracked and tokens that are throttled
+        are rested before being used again. A rejected token is
+        not used again.
+"""
+
+# External imports
+import logging
+import threading
+import time
+
+import requests
+
+# Internal imports
+from src.custom_errors import AccessTokenError
+
+
+class accessToken():
+    """State of a single access token"""
+
+    def __init__(self, token: str, position: int) -> None:
+        self.token: str = token
+        self.position: int = position
+        self.in_flight: int = 0
+        # Remaining rate limit budget reported by canvas, None until known
+        self.remaining: float = None
+        self.rested_until: float = 0.0
+        self.requests: int = 0
+        # Revoked or invalid, the token will not recover during the run
+        self.rejected: bool = False
+
+    @property
+    def header(self) -> dict:
+        return {"Authorization": f"Bearer {self.token}"}
+
+    def available(self, now: float) -> bool:
+        return not self.rejected and now >= self.rested_until
+
+
+class TokenPool():
+    """Assigns requests to the least loaded available access token"""
+
+    # Seconds a throttled token is rested
+    THROTTLE_REST = 30
+    # Budget below which a token is briefly rested to let it refill
+    LOW_BUDGET = 50.0
+    LOW_BUDGET_REST = 2
+
+    def __init__(self, tokens: list[str]) -> None:
+        unique_tokens: list[str] = list(dict.fromkeys(token for token in tokens if token))
+        if not unique_tokens:
+            raise ValueError("No canvas access token has been provided")
+
+        self.tokens: list[accessToken] = [
+            accessToken(token, position) for position, token in enumerate(unique_tokens)
+        ]
+        self._lock = threading.Lock()
+        self.log: logging.Logger = logging.getLogger(__name__)
+        # Number of times a token has been throttled
+        self.throttled: int = 0
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def acquire(self) -> accessToken:
+        """Returns a token for a request, waiting if every token is resting"""
+        while True:
+            with self._lock:
+                usable = [token for token in self.tokens if not token.rejected]
+                if not usable:
+                    # Waiting cannot help, fail the request straight away
+                    raise AccessTokenError("Canvas has rejected every access token")
+
+                now: float = time.monotonic()
+                available = [token for token in self.tokens if token.available(now)]
+
+                if available:
+                    # Fewest requests in flight first, then the largest budget
+                    token = min(
+                        available,
+                        key=lambda token: (
+                            token.in_flight,
+                            -(token.remaining if token.remaining is not None else float("inf")),
+                        ),
+                    )
+                    token.in_flight += 1
+                    token.requests += 1
+                    return token
+
+                # Only throttled or low budget tokens are waited for
+                wait: float = min(token.rested_until for token in usable) - now
+
+            time.sleep(max(wait, 0.05))
+
+    def release(self, token: accessToken, response: requests.Response) -> bool:
+        """Records the response for a token, returns False if it was rejected for the token"""
+        with self._lock:
+            token.in_flight -= 1
+
+            # The request failed before canvas answered
+            if response is None:
+                return True
+
+            remaining = response.headers.get("X-Rate-Limit-Remaining")
+            if remaining is not None:
+                token.remaining = float(remaining)
+
+            # Canvas throttles with a 403 and a rate limit message
+            if response.status_code == 403 and "Rate Limit Exceeded" in response.text:
+                self.throttled += 1
+                self._rest(token, self.THROTTLE_REST, "throttled")
+                return False
+
+            # Canvas also answers 401 when the user lacks permission for a
+            # resource, only an invalid or revoked token rests the token
+            if self.token_rejected(response):
+                token.rejected = True
+                self.log.error(
+                    "CANVAS: Access token %i rejected, it will not be used again", token.position + 1
+                )
+                return False
+
+            if token.remaining is not None and token.remaining < self.LOW_BUDGET:
+                token.rested_until = time.monotonic() + self.LOW_BUDGET_REST
+
+        return True
+
+    @staticmethod
+    def token_rejected(response: requests.Response) -> bool:
+        """True if canvas refused the token itself rather than the action"""
+        if response.status_code != 401:
+            return False
+        return (
+            "WWW-Authenticate" in response.headers
+            or "Invalid access token" in response.text
+        )
+
+    def lowest_budget(self) -> float:
+        """Smallest remaining budget reported for any token, None if unknown"""
+        budgets = [token.remaining for token in self.tokens if token.remaining is not None]
+        return min(budgets) if budgets else None
+
+    def _rest(self, token: accessToken, seconds: float, reason: str) -> None:
+        """Take a token out of rotation, the lock must be held"""
+        token.rested_until = time.monotonic() + seconds
+        self.log.warning(
+            "CANVAS: Access token %i %s, resting for %is", token.position + 1, reason, seconds
+        )
@@ -0,0 +1,82 @@
+"""
+    Date:   19/10/2026
+    Purpose:
+        Optional HTTP/2 transport for the canvas API host. Many
+        in-flight API requests share a few multiplexed connections
+        instead of each holding its own HTTP/1.1 connection.
+        Requires the httpx package with its http2 extras:
+            pip install "httpx[http2]"
+        The throughput of both transports can be compared with
+        benchmark_transports.
+"""
+
+# External imports
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# Internal imports
+
+
+class http2Transport():
+    """Sends canvas API requests over multiplexed HTTP/2 connections"""
+
+    # Seconds to wait for canvas before a request fails
+    TIMEOUT = 60.0
+
+    def __init__(self, connections: int = 2) -> None:
+        if httpx is None:
+            raise ImportError(
+                'The HTTP/2 transport needs the httpx package: pip install "httpx[http2]"'
+            )
+
+        self._client = httpx.Client(
+            http2=True,
+            follow_redirects=True,
+            timeout=self.TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=connections, max_keepalive_connections=connections
+            ),
+        )
+
+    def request(self, method: str, url: str, **kwargs) -> "httpx.Response":
+        """Send a request, accepting the same arguments as requests.Session.request"""
+        # requests names this option differently
+        if "allow_redirects" in kwargs:
+            kwargs["follow_redirects"] = kwargs.pop("allow_redirects")
+        return self._client.request(method, url, **kwargs)
+
+    def close(self) -> None:
+        self._client.close()
+
+
+def benchmark_transports(make_connector, request_count: int, workers: int) -> dict[str, float]:
+    """
+    Compare requests per second of the HTTP/1.1 pool and the HTTP/2 transport.
+    make_connector(http2) returns a connector using the chosen transport
+    """
+    # Variables
+    results: dict[str, float] = {}
+    log: logging.Logger = logging.getLogger(__name__)
+
+    for name, http2 in (("HTTP/1.1", False), ("HTTP/2", True)):
+        connector = make_connector(http2)
+
+        # Read-only requests, so the benchmark changes nothing in canvas
+        start: float = time.monotonic()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(lambda _: connector.test_canvas_connection(), range(request_count)))
+        results[name] = request_count / (time.monotonic() - start)
+        connector.close()
+
+        log.info(
+            "BENCHMARK: %s %i requests with %i workers, %.1f requests/s",
+            name, request_count, workers, results[name],
+        )
+
+    return results
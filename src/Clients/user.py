@@ -22,3 +22,10 @@ class client():
 
         self.client_id: str = str(client_id)
         self.image: image = client_image
+
+        # The SIS id is kept as client_id is replaced by the canvas id
+        self.sis_id: str = str(client_id)
+        self.canvas_id: int = None
+
+        # Lower values are processed first
+        self.priority: int = 0
@@ -6,7 +6,8 @@
 '''
 
 # External imports
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from datetime import datetime
 
 try:
     import yaml
@@ -14,6 +15,8 @@ except ImportError as e:
     raise ImportError(f"Cannot import YAML parsing package: {e}")
 
 # Internal Imports
+from src.Canvas.bandwidth import parse_rate
+from src.custom_errors import SettingsLoadError
 
 
 # Classes
@@ -33,6 +36,28 @@ class Config():
     log_filename: str
     csv_filename: str
 
+    # Upload settings
+    reuse_existing_files: bool = False
+    # Upload bandwidth cap in bytes per second, 0 is unlimited
+    bandwidth_limit: int = 0
+    bandwidth_schedule: list = field(default_factory=list)
+
+    # Run settings
+    cache_directory: str = "Cache/"
+    deadline: str = None
+    priority_rules: dict = field(default_factory=dict)
+    trace_sample_rate: float = 0.0
+    calibrate: bool = True
+
+    # Items requested per page from canvas list endpoints
+    per_page: int = 100
+
+    # Extra access tokens, requests are spread across all tokens
+    access_tokens: list = field(default_factory=list)
+
+    # Send API requests over HTTP/2
+    http2: bool = False
+
 
 class YAML_Parser():
     '''Parses yaml settings'''
@@ -67,7 +92,10 @@ class YAML_Parser():
 
     def load_config(self) -> Config:
         ''' load a config'''
-        
+        # Optional sections fall back to the Config defaults
+        upload_options: dict = self.Settings_contents.get('Upload_options') or {}
+        run_options: dict = self.Settings_contents.get('Run_options') or {}
+
         conf = self.configuration(
             working_path=self.Settings_contents['Directories']['working_path'],
             access_token=self.Settings_contents['Canvas_data']['access_token'],
@@ -75,7 +103,75 @@ class YAML_Parser():
             csv_directory=self.Settings_contents['Directories']['csv_directory'],
             csv_filename=self.Settings_contents['File_names']['csv_filename'],
             images_path=self.Settings_contents['Directories']['images_directory'],
-            log_filename=self.Settings_contents['File_names']['log_filename']
+            log_filename=self.Settings_contents['File_names']['log_filename'],
+            reuse_existing_files=bool(
+                upload_options.get('reuse_existing_files', False)),
+            bandwidth_limit=self.parse_bandwidth(
+                upload_options.get('bandwidth_limit'), 'bandwidth_limit'),
+            bandwidth_schedule=self.parse_schedule(upload_options.get('bandwidth_schedule')),
+            cache_directory=self.Settings_contents['Directories'].get(
+                'cache_directory', 'Cache/'),
+            deadline=self.parse_time(run_options.get('deadline'), 'deadline'),
+            priority_rules=dict(run_options.get('priority_rules') or {}),
+            trace_sample_rate=float(run_options.get('trace_sample_rate') or 0.0),
+            calibrate=bool(run_options.get('calibrate', True)),
+            per_page=int(self.Settings_contents['Canvas_data'].get('per_page', 100)),
+            access_tokens=list(
+                self.Settings_contents['Canvas_data'].get('access_tokens') or []),
+            http2=bool(self.Settings_contents['Canvas_data'].get('http2', False))
         )
 
-        return conf
\ No newline at end of file
+        return conf
+
+    @classmethod
+    def parse_schedule(cls, schedule) -> list[dict]:
+        ''' Returns the bandwidth schedule with its times as HH:MM '''
+        windows: list[dict] = []
+
+        for window in schedule or []:
+            if not isinstance(window, dict):
+                raise SettingsLoadError(
+                    f"bandwidth_schedule entries need a start, end and limit, not: {window}")
+            if not {'start', 'end', 'limit'} <= window.keys():
+                raise SettingsLoadError(
+                    f"bandwidth_schedule entries need a start, end and limit: {window}")
+
+            windows.append({
+                **window,
+                "start": cls.parse_time(window['start'], 'bandwidth_schedule start'),
+                "end": cls.parse_time(window['end'], 'bandwidth_schedule end'),
+                "limit": cls.parse_bandwidth(window['limit'], 'bandwidth_schedule limit'),
+            })
+
+            if windows[-1]["start"] is None or windows[-1]["end"] is None:
+                raise SettingsLoadError(
+                    f"bandwidth_schedule entries need a start and end time: {window}")
+
+        return windows
+
+    @staticmethod
+    def parse_bandwidth(value, setting: str) -> int:
+        ''' Returns a bandwidth setting in bytes per second, 0 is unlimited '''
+        try:
+            return parse_rate(value)
+        except ValueError:
+            raise SettingsLoadError(
+                f"{setting} must be a rate such as 5MB, 500KB or 0, not: {value}") from None
+
+    @staticmethod
+    def parse_time(value, setting: str) -> str:
+        ''' Returns a time of day setting as HH:MM, or None if it is not set '''
+        if value is None:
+            return None
+
+        # YAML reads an unquoted 22:30 as the number of minutes, 1350
+        if isinstance(value, int) and not isinstance(value, bool):
+            if 0 <= value < 24 * 60:
+                return f"{value // 60:02d}:{value % 60:02d}"
+        elif isinstance(value, str):
+            try:
+                return datetime.strptime(value.strip(), "%H:%M").strftime("%H:%M")
+            except ValueError:
+                pass
+
+        raise SettingsLoadError(f"{setting} must be a time of day as HH:MM, not: {value}")
\ No newline at end of file
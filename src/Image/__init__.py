@@ -4,4 +4,5 @@
 # imports
 
 # local imports
-from .image import image, imageFactory
\ No newline at end of file
+from .image import image, imageFactory
+from .sources import imageSource, directory_Source, zip_Source, tar_Source, open_image_source
\ No newline at end of file
@@ -5,11 +5,14 @@
         Class representing an image
 '''
 # External imports
-import os
+import hashlib
+import io
 from dataclasses import dataclass, field
+from typing import BinaryIO
 
 
 # Internal Imports
+from src.Image.sources import imageSource
 
 # File Class
 @dataclass
@@ -19,37 +22,64 @@ class image:
     image_path: str = field(compare=False)
     file_type: str = field(compare=False)
     image_size: int = field(init=False)
-    image_canvas_id: str = field(init=False)
+    image_canvas_id: str = field(init=False, default=None)
+    # Images from a source are read on demand instead of held in memory
+    image_source: imageSource = field(compare=False, default=None, repr=False)
 
     def __post_init__(self):
-        imgSize: int = (self.image_file.__sizeof__())
+        if self.image_source is not None:
+            imgSize: int = self.image_source.size(self.image_name)
+        else:
+            # Use the length of the bytes, __sizeof__ includes the
+            # object header and would not match the size reported by canvas
+            imgSize = len(self.image_file)
         print(f'Bytes Size: {imgSize}')
-        # imgSize = os.path.getsize(f'{self.image_path}{self.image_name}')
-        # print(imgSize)
         self.image_size = imgSize
 
+    def open_stream(self) -> BinaryIO:
+        '''Open the image contents for reading'''
+        if self.image_source is not None:
+            return self.image_source.open_member(self.image_name)
+        return io.BytesIO(self.image_file)
+
+    def read_bytes(self) -> bytes:
+        '''Read the full image contents'''
+        if self.image_source is not None:
+            return self.image_source.read_member(self.image_name)
+        return self.image_file
+
+    def md5(self) -> str:
+        '''MD5 hex digest of the image contents'''
+        if self.image_source is not None:
+            return self.image_source.md5(self.image_name)
+        return hashlib.md5(self.image_file).hexdigest()
+
 
 # File module
 class imageFactory():
     ''' Handles all images for the app '''
 
-    def __init__(self, img_path: str, img_name: str) -> None:
+    def __init__(self, img_source: imageSource, img_name: str) -> None:
 
         # Check that specified image exists
-        if not(self.image_exists(img_path, img_name)):
+        if not(self.image_exists(img_source, img_name)):
             raise OSError("File not Found")
 
-        self.image_path: str = img_path
+        self.image_source: imageSource = img_source
+        self.image_path: str = img_source.location
         self.image_name: str = img_name
 
     def open_image(self) -> image:
         '''Open an image file'''
-        # Open file as byte file
-        img_bytes = open(f'{self.image_path}{self.image_name}', 'rb').read()
-
-        # create image file object and return
-        return image(img_bytes, self.image_name, self.image_path, "")
+        # The contents are streamed from the source when uploaded
+        return image(
+            None,
+            self.image_name,
+            self.image_path,
+            self.image_source.content_type(self.image_name),
+            image_source=self.image_source,
+        )
 
-    def image_exists(self, image_path: str, image_name: str) -> bool:
+    def image_exists(self, img_source: imageSource, image_name: str) -> bool:
         ''' Check that an image exists'''
-        return os.path.exists(f'{image_path}{image_name}')
+        return img_source.exists(image_name)
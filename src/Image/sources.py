@@ -0,0 +1,192 @@
+'''
+    Date:   19/10/2026
+    Purpose:
+        Collection of classes that provide the image files for
+        the app. Each source indexes its members when opened
+        and streams a member's contents when it is requested,
+        so archives never need to be extracted.
+'''
+
+# External imports
+import hashlib
+import io
+import os
+import tarfile
+import zipfile
+from abc import ABC, abstractmethod
+from typing import BinaryIO
+
+# Internal imports
+
+
+class imageSource(ABC):
+    '''Abstract class for a collection of images'''
+
+    @abstractmethod
+    def __init__(self, location: str) -> None:
+        '''Open the source and index its members'''
+        self.location: str = location
+        self.members: dict[str, int] = {}
+
+    @abstractmethod
+    def _open_member(self, member: str) -> BinaryIO:
+        '''Returns a readable stream for an indexed member'''
+
+    def resolve(self, image_name: str) -> str:
+        '''Returns the member for an image name, or None if it is missing'''
+        if image_name in self.members:
+            return image_name
+
+        # Archives often keep the images inside a top level folder,
+        # so fall back to a unique match on the file name alone
+        matches = [
+            member for member in self.members
+            if os.path.basename(member) == image_name
+        ]
+        if len(matches) == 1:
+            return matches[0]
+
+        return None
+
+    def exists(self, image_name: str) -> bool:
+        '''Check that an image exists in the source'''
+        return self.resolve(image_name) is not None
+
+    def size(self, image_name: str) -> int:
+        '''Size of an image in bytes'''
+        return self.members[self.resolve(image_name)]
+
+    def open_member(self, image_name: str) -> BinaryIO:
+        '''Open an image for streaming'''
+        member = self.resolve(image_name)
+        if member is None:
+            raise OSError(f"File not Found: {image_name}")
+        return self._open_member(member)
+
+    def read_member(self, image_name: str) -> bytes:
+        '''Read the full contents of an image'''
+        with self.open_member(image_name) as member_file:
+            return member_file.read()
+
+    def content_type(self, image_name: str) -> str:
+        '''MIME type of an image, empty lets canvas detect it'''
+        return ""
+
+    def md5(self, image_name: str) -> str:
+        '''MD5 hex digest of an image'''
+        return hashlib.md5(self.read_member(image_name)).hexdigest()
+
+    def close(self) -> None:
+        '''Release any open handles'''
+
+
+class directory_Source(imageSource):
+    '''Images stored as files within a directory'''
+
+    def __init__(self, location: str) -> None:
+        self.location: str = location
+        self.members: dict[str, int] = {}
+
+        # Index every file, using paths relative to the directory
+        for root, _, files in os.walk(location):
+            for file_name in files:
+                full_path = os.path.join(root, file_name)
+                member = os.path.relpath(full_path, location).replace(os.sep, "/")
+                self.members[member] = os.path.getsize(full_path)
+
+    def _open_member(self, member: str) -> BinaryIO:
+        return open(os.path.join(self.location, member), 'rb')
+
+
+class zip_Source(imageSource):
+    '''Images stored within a zip archive'''
+
+    def __init__(self, location: str) -> None:
+        self.location: str = location
+        self._archive = zipfile.ZipFile(location)
+
+        # The central directory gives the index without reading any images
+        self.members: dict[str, int] = {
+            info.filename: info.file_size
+            for info in self._archive.infolist()
+            if not info.is_dir()
+        }
+
+    def _open_member(self, member: str) -> BinaryIO:
+        # ZipFile supports members being read from several threads
+        return self._archive.open(member)
+
+    def close(self) -> None:
+        self._archive.close()
+
+
+class tar_Source(imageSource):
+    '''Images stored within a tar archive'''
+
+    def __init__(self, location: str) -> None:
+        self.location: str = location
+
+        # Members are read at their offsets, which needs an uncompressed archive.
+        # Users are not processed in archive order, so a compressed archive
+        # would be decompressed again from the start for most members
+        try:
+            self._archive = tarfile.open(location, "r:")
+        except tarfile.ReadError:
+            raise ValueError(
+                f"Compressed tar archives are not supported: {location}. "
+                "Use a zip archive or an uncompressed tar"
+            ) from None
+
+        self._infos: dict[str, tarfile.TarInfo] = {}
+        self.members: dict[str, int] = {}
+        for info in self._archive.getmembers():
+            if not info.isfile():
+                continue
+            member = info.name[2:] if info.name.startswith("./") else info.name
+            self.members[member] = info.size
+            self._infos[member] = info
+
+    def _open_member(self, member: str) -> BinaryIO:
+        # Each stream has its own handle so uploads can run in parallel
+        return io.BufferedReader(
+            _segmentReader(self.location, self._infos[member].offset_data, self.members[member])
+        )
+
+    def close(self) -> None:
+        self._archive.close()
+
+
+class _segmentReader(io.RawIOBase):
+    '''Reads a range of bytes from a file'''
+
+    def __init__(self, path: str, offset: int, size: int) -> None:
+        self._file = open(path, 'rb')
+        self._file.seek(offset)
+        self._remaining: int = size
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        count: int = min(len(buffer), self._remaining)
+        if count == 0:
+            return 0
+        read: int = self._file.readinto(memoryview(buffer)[:count])
+        self._remaining -= read
+        return read
+
+    def close(self) -> None:
+        self._file.close()
+        super().close()
+
+
+def open_image_source(location: str) -> imageSource:
+    '''Returns the image source matching the location type'''
+    if os.path.isdir(location):
+        return directory_Source(location)
+    if zipfile.is_zipfile(location):
+        return zip_Source(location)
+    if tarfile.is_tarfile(location):
+        return tar_Source(location)
+
+    raise ValueError(f"Unsupported image source: {location}")
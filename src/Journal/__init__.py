@@ -0,0 +1,7 @@
+# -------------------------
+# init file for journal module
+
+# imports
+
+# local imports
+from .journal import OutcomeJournal
@@ -0,0 +1,103 @@
+'''
+    Date:   19/10/2026
+    Purpose:
+        Records the outcome of each user as it is processed,
+        so the result of a run survives it being interrupted.
+        Entries are kept per canvas domain, as SIS ids map to
+        different canvas ids on test and production instances.
+'''
+
+# External imports
+import json
+import os
+import threading
+import time
+from typing import Iterator
+
+# Internal imports
+from src.Clients import client
+
+
+class OutcomeJournal():
+    ''' Appends one JSON line per processed user '''
+
+    # Name of the journal within the cache directory
+    JOURNAL_FILENAME = "outcomes.jsonl"
+
+    def __init__(self, cache_directory: str, domain: str) -> None:
+        os.makedirs(cache_directory, exist_ok=True)
+
+        self.domain: str = domain
+
+        self.journal_path: str = f"{cache_directory}{self.JOURNAL_FILENAME}"
+        # Reentrant, as a signal handler may flush while the main thread writes
+        self._lock = threading.RLock()
+        self._journal_file = open(self.journal_path, "a", encoding="utf-8")
+
+    def record(self, user: client, status: str, **details) -> None:
+        ''' Write the outcome for a user to the journal '''
+        entry: dict = {
+            "time": time.time(),
+            "domain": self.domain,
+            "sis_id": user.sis_id,
+            "canvas_id": user.canvas_id,
+            "image_name": user.image.image_name if user.image else None,
+            "file_id": user.image.image_canvas_id if user.image else None,
+            "status": status,
+        }
+        entry.update(details)
+
+        # Workers record outcomes concurrently
+        with self._lock:
+            self._journal_file.write(json.dumps(entry) + "\n")
+
+    def flush(self) -> None:
+        ''' Push written outcomes to disk '''
+        with self._lock:
+            self._journal_file.flush()
+            os.fsync(self._journal_file.fileno())
+
+    @classmethod
+    def load_entries(cls, cache_directory: str, domain: str) -> Iterator[dict]:
+        ''' Yields every journal entry for the domain, oldest first '''
+        journal_path: str = f"{cache_directory}{cls.JOURNAL_FILENAME}"
+
+        if not os.path.exists(journal_path):
+            return
+
+        with open(journal_path, encoding="utf-8") as journal_file:
+            for line in journal_file:
+                try:
+                    entry: dict = json.loads(line)
+                except json.JSONDecodeError:
+                    # An interrupted write leaves a partial last line
+                    continue
+
+                # Entries without a domain cannot be trusted for any instance
+                if entry.get("domain") == domain:
+                    yield entry
+
+    @classmethod
+    def load_latest(cls, cache_directory: str, domain: str) -> dict[str, dict]:
+        ''' Returns the most recent journal entry for each SIS id on the domain '''
+        return {entry["sis_id"]: entry for entry in cls.load_entries(cache_directory, domain)}
+
+    @classmethod
+    def load_file_ids(cls, cache_directory: str, domain: str) -> dict[str, set]:
+        ''' Returns the ids of every file uploaded for each SIS id on the domain '''
+        # Variables
+        file_ids: dict[str, set] = {}
+
+        for entry in cls.load_entries(cache_directory, domain):
+            if entry.get("file_id") is not None:
+                file_ids.setdefault(entry["sis_id"], set()).add(entry["file_id"])
+
+        return file_ids
+
+    def close(self) -> None:
+        ''' Flush and close the journal '''
+        if self._journal_file.closed:
+            return
+        self.flush()
+        with self._lock:
+            self._journal_file.close()
@@ -5,3 +5,4 @@
 
 # local imports
 from .log import configure_logging
+from .progress import ProgressLine
@@ -0,0 +1,125 @@
+'''
+    Date:   19/10/2026
+    Purpose:
+        Live progress line for long running uploads
+'''
+# External imports
+import logging
+import sys
+import threading
+import time
+
+
+class ProgressLine():
+    ''' Tracks completed users and reports rate and ETA '''
+
+    # Seconds between progress entries when not writing to a terminal
+    LOG_INTERVAL = 30
+
+    def __init__(self, total: int, label: str = "PROGRESS") -> None:
+        self.total: int = total
+        self.label: str = label
+        self.done: int = 0
+        self.failed: int = 0
+        self.in_flight: int = 0
+
+        self._lock = threading.Lock()
+        self._start: float = time.monotonic()
+        self._last_log: float = 0.0
+        self._interactive: bool = sys.stderr.isatty()
+        self.log: logging.Logger = logging.getLogger(__name__)
+
+        # Console log records clear the line before they are written,
+        # the line is drawn again below them on the next render
+        self._drawn: bool = False
+        self._handlers: list[logging.Handler] = []
+        if self._interactive:
+            self._handlers = self.console_handlers()
+            for handler in self._handlers:
+                handler.emit = self._clear_before(handler.emit)
+
+    def completed(self, success: bool) -> None:
+        ''' Count a finished user '''
+        with self._lock:
+            if success:
+                self.done += 1
+            else:
+                self.failed += 1
+
+    def describe(self) -> str:
+        ''' Returns the current progress as a single line '''
+        elapsed: float = max(time.monotonic() - self._start, 1e-6)
+        finished: int = self.done + self.failed
+        rate: float = finished / elapsed
+
+        if rate > 0:
+            eta: str = self.format_seconds((self.total - finished) / rate)
+        else:
+            eta = "--:--:--"
+
+        return (
+            f"{self.label}: {finished}/{self.total} "
+            f"done={self.done} failed={self.failed} in-flight={self.in_flight} "
+            f"{rate:.2f} users/s ETA {eta}"
+        )
+
+    def render(self, in_flight: int) -> None:
+        ''' Redraw the progress line, or log it periodically '''
+        self.in_flight = in_flight
+
+        if self._interactive:
+            # Holding the console handler locks keeps log records off the line
+            for handler in self._handlers:
+                handler.acquire()
+            try:
+                sys.stderr.write("\r" + self.describe() + "\033[K")
+                sys.stderr.flush()
+                self._drawn = True
+            finally:
+                for handler in reversed(self._handlers):
+                    handler.release()
+        elif time.monotonic() - self._last_log >= self.LOG_INTERVAL:
+            self._last_log = time.monotonic()
+            self.log.info(self.describe())
+
+    def finish(self) -> None:
+        ''' End the progress line and log the final counts '''
+        self.in_flight = 0
+        if self._interactive:
+            self._clear()
+            # Remove the wrappers added to the console handlers
+            for handler in self._handlers:
+                del handler.emit
+            self._handlers = []
+        self.log.info(self.describe())
+
+    @staticmethod
+    def console_handlers() -> list[logging.Handler]:
+        ''' Returns the root log handlers writing to a terminal '''
+        return [
+            handler for handler in logging.getLogger().handlers
+            if isinstance(handler, logging.StreamHandler)
+            and not isinstance(handler, logging.FileHandler)
+            and getattr(handler.stream, "isatty", lambda: False)()
+        ]
+
+    def _clear_before(self, emit):
+        ''' Wraps a handler's emit to clear the progress line first '''
+        def emit_below_progress(record: logging.LogRecord) -> None:
+            self._clear()
+            emit(record)
+        return emit_below_progress
+
+    def _clear(self) -> None:
+        ''' Erase the progress line if it is drawn '''
+        if self._drawn:
+            sys.stderr.write("\r\033[K")
+            sys.stderr.flush()
+            self._drawn = False
+
+    @staticmethod
+    def format_seconds(seconds: float) -> str:
+        ''' Formats seconds as H:MM:SS '''
+        minutes, seconds = divmod(int(seconds), 60)
+        hours, minutes = divmod(minutes, 60)
+        return f"{hours}:{minutes:02}:{seconds:02}"
@@ -0,0 +1,7 @@
+# -------------------------
+# init file for planner module
+
+# imports
+
+# local imports
+from .planner import RunPlanner, runPlan
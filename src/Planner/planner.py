@@ -0,0 +1,160 @@
+'''
+    Date:   19/10/2026
+    Purpose:
+        Estimates the work of a run before anything is pushed:
+        the requests and bytes needed for each user and how long
+        the run will take at different numbers of workers.
+'''
+
+# External imports
+import logging
+import time
+from dataclasses import dataclass
+
+# Internal imports
+from src.Canvas import POST_data_canvas, requestStats
+from src.Clients import client
+from src.Journal import OutcomeJournal
+
+
+@dataclass
+class runPlan:
+    ''' The work needed for a run '''
+    users: int
+    lookups: int
+    uploads: int
+    avatar_only: int
+    upload_bytes: int
+    requests: int
+    latency: float = None
+    upload_throughput: float = None
+    measured_by: str = "unknown"
+
+    def estimate(self, workers: int) -> float:
+        ''' Estimated seconds for the run with a number of workers, None if unknown '''
+        if self.latency is None:
+            return None
+
+        request_seconds: float = self.requests * self.latency
+        transfer_seconds: float = 0.0
+        if self.upload_throughput:
+            transfer_seconds = self.upload_bytes / self.upload_throughput
+
+        return (request_seconds + transfer_seconds) / workers
+
+
+class RunPlanner():
+    ''' Builds a run plan from the users and local caches '''
+
+    # Requests made for each step of a user
+    LOOKUP_REQUESTS = 1
+    UPLOAD_REQUESTS = 3
+    REUSE_REQUESTS = 2
+    AVATAR_REQUESTS = 2
+
+    # Requests timed by the probe
+    PROBE_REQUESTS = 5
+
+    # Worker counts the duration is estimated for
+    CONCURRENCY_LEVELS = (1, 5, 10, 20, 40)
+
+    def __init__(self, cache_directory: str, domain: str, reuse_existing_files: bool) -> None:
+        self.cache_directory: str = cache_directory
+        self.domain: str = domain
+        self.reuse_existing_files: bool = reuse_existing_files
+        self.log: logging.Logger = logging.getLogger(__name__)
+
+    def plan(self, user_list: list[client]) -> runPlan:
+        ''' Count the requests and bytes needed for the users '''
+        # Variables
+        journal: dict[str, dict] = OutcomeJournal.load_latest(self.cache_directory, self.domain)
+        lookups: int = 0
+        uploads: int = 0
+        avatar_only: int = 0
+        upload_bytes: int = 0
+        requests: int = 0
+
+        for user in user_list:
+            if user.canvas_id is None:
+                lookups += 1
+                requests += self.LOOKUP_REQUESTS
+
+            # Every user has their profile pictures listed when reusing files
+            if self.reuse_existing_files:
+                requests += self.REUSE_REQUESTS
+
+            # A file uploaded by a previous run is found and reused
+            previous: dict = journal.get(user.sis_id, {})
+            if (
+                self.reuse_existing_files
+                and previous.get("status") == "done"
+                and previous.get("image_name") == user.image.image_name
+            ):
+                avatar_only += 1
+            else:
+                uploads += 1
+                upload_bytes += user.image.image_size
+                requests += self.UPLOAD_REQUESTS
+
+            requests += self.AVATAR_REQUESTS
+
+        run_plan = runPlan(
+            users=len(user_list),
+            lookups=lookups,
+            uploads=uploads,
+            avatar_only=avatar_only,
+            upload_bytes=upload_bytes,
+            requests=requests,
+        )
+
+        # Start from the figures of the previous run
+        recorded: dict = requestStats.load(self.cache_directory, self.domain)
+        if recorded:
+            run_plan.latency = recorded.get("latency")
+            run_plan.upload_throughput = recorded.get("upload_throughput")
+            run_plan.measured_by = "previous run"
+
+        return run_plan
+
+    def probe(self, connector: POST_data_canvas, run_plan: runPlan) -> None:
+        ''' Measure the request latency against canvas '''
+        # Variables
+        durations: list[float] = []
+
+        for _ in range(self.PROBE_REQUESTS):
+            start: float = time.monotonic()
+            connector.test_canvas_connection()
+            durations.append(time.monotonic() - start)
+
+        run_plan.latency = sum(durations) / len(durations)
+        run_plan.measured_by = "probe" if run_plan.measured_by == "unknown" else "probe and previous run"
+
+    def report(self, run_plan: runPlan) -> list[str]:
+        ''' Returns the plan as lines for the log '''
+        lines: list[str] = [
+            f"Users:                 {run_plan.users}",
+            f"Canvas id lookups:     {run_plan.lookups}",
+            f"Uploads:               {run_plan.uploads}",
+            f"Avatar set only:       {run_plan.avatar_only}",
+            f"Bytes to upload:       {run_plan.upload_bytes}",
+            f"API requests:          {run_plan.requests}",
+        ]
+
+        if run_plan.latency is None:
+            lines.append("No latency measurement is available, the duration cannot be estimated")
+            return lines
+
+        lines.append(f"Request latency:       {run_plan.latency * 1000:.0f} ms ({run_plan.measured_by})")
+        if run_plan.upload_throughput:
+            lines.append(f"Upload throughput:     {run_plan.upload_throughput / 1024:.0f} KB/s per upload")
+        else:
+            lines.append("Upload throughput:     unknown, transfer time is not included")
+
+        # Assumes canvas does not throttle the requests
+        for workers in self.CONCURRENCY_LEVELS:
+            seconds: float = run_plan.estimate(workers)
+            minutes, seconds = divmod(int(seconds), 60)
+            hours, minutes = divmod(minutes, 60)
+            lines.append(f"Estimated duration with {workers:>3} workers: {hours}:{minutes:02}:{seconds:02}")
+
+        return lines
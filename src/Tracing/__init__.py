@@ -0,0 +1,7 @@
+# -------------------------
+# init file for tracing module
+
+# imports
+
+# local imports
+from .tracer import Tracer, export_chrome_trace
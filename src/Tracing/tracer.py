@@ -0,0 +1,126 @@
+'''
+    Date:   19/10/2026
+    Purpose:
+        Optional per-user request tracing. A sampled share of the
+        users are traced, and each request made for them is written
+        as a span to a JSON-lines file. Each line is a complete
+        event in the Chrome trace event format, so the file can be
+        opened in chrome://tracing or Perfetto once wrapped in a
+        list (see export_chrome_trace).
+'''
+
+# External imports
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+# Internal imports
+
+
+class Tracer():
+    ''' Writes sampled traces of users and their requests '''
+
+    # Name of the trace file within the cache directory
+    TRACE_FILENAME = "trace.jsonl"
+
+    def __init__(self, cache_directory: str = None, sample_rate: float = 0.0) -> None:
+        self.sample_rate: float = sample_rate
+        self.trace_path: str = None
+        self._trace_file = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._trace_ids = itertools.count(1)
+
+        # Nothing is opened when tracing is disabled
+        if cache_directory and sample_rate > 0:
+            os.makedirs(cache_directory, exist_ok=True)
+            self.trace_path = f"{cache_directory}{self.TRACE_FILENAME}"
+            self._trace_file = open(self.trace_path, "a", encoding="utf-8")
+
+    @property
+    def enabled(self) -> bool:
+        return self._trace_file is not None
+
+    @contextmanager
+    def trace(self, name: str, **attributes) -> Iterator[dict]:
+        ''' Trace everything on this thread within the block, if sampled '''
+        if not self.enabled or random.random() >= self.sample_rate:
+            yield {}
+            return
+
+        self._local.trace_id = next(self._trace_ids)
+        try:
+            with self.span(name, **attributes) as root:
+                yield root
+        finally:
+            self._local.trace_id = None
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[dict]:
+        ''' Time a block as a span of the current trace. Keys set on the yielded dict are recorded '''
+        trace_id: int = getattr(self._local, "trace_id", None)
+        if trace_id is None:
+            # Not sampled, the caller's attributes are discarded
+            yield {}
+            return
+
+        details: dict = dict(attributes)
+        start: float = time.time()
+        try:
+            yield details
+        except Exception as error:
+            details["error"] = str(error)
+            raise
+        finally:
+            self._write({
+                "name": name,
+                "cat": "canvas",
+                "ph": "X",
+                "ts": int(start * 1_000_000),
+                "dur": int((time.time() - start) * 1_000_000),
+                "pid": os.getpid(),
+                "tid": trace_id,
+                "args": details,
+            })
+
+    def bind(self, function: Callable) -> Callable:
+        ''' Returns function bound to this thread's trace, for running on another thread '''
+        trace_id: int = getattr(self._local, "trace_id", None)
+        if trace_id is None:
+            return function
+
+        def traced(*args, **kwargs):
+            previous: int = getattr(self._local, "trace_id", None)
+            self._local.trace_id = trace_id
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self._local.trace_id = previous
+
+        return traced
+
+    def _write(self, event: dict) -> None:
+        line: str = json.dumps(event, default=str) + "\n"
+        with self._lock:
+            self._trace_file.write(line)
+
+    def close(self) -> None:
+        ''' Flush and close the trace file '''
+        if self.enabled:
+            with self._lock:
+                self._trace_file.close()
+            self._trace_file = None
+
+
+def export_chrome_trace(trace_path: str, output_path: str) -> None:
+    ''' Wrap a JSON-lines trace in the JSON object trace viewers load '''
+    with open(trace_path, encoding="utf-8") as trace_file:
+        events: list[dict] = [json.loads(line) for line in trace_file if line.strip()]
+
+    with open(output_path, "w", encoding="utf-8") as output_file:
+        json.dump({"traceEvents": events}, output_file)
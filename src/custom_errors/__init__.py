@@ -9,4 +9,6 @@
 ## Module imports
 ###########################
 
-from .errors import DirectoriesCheckError                   # Error when verifying critical folders
\ No newline at end of file
+from .errors import DirectoriesCheckError                   # Error when verifying critical folders
+from .errors import SettingsLoadError                       # Error when a setting is invalid
+from .errors import AccessTokenError                        # Error when canvas rejects every access token
\ No newline at end of file
@@ -18,4 +18,12 @@ class DirectoriesCheckError(Exception):
 class SettingsLoadError(Exception):
     def __init__(self, message: str) -> None:
         self.message: str = message
-        super().__init__(self.message)
\ No newline at end of file
+        super().__init__(self.message)
+###############################
+## Canvas Errors
+###############################
+
+class AccessTokenError(Exception):
+    def __init__(self, message: str) -> None:
+        self.message: str = message
+        super().__init__(self.message)